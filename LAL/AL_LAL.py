@@ -18,53 +18,22 @@ from Classes.dataset import DatasetStriatumMini
 from Classes.dataset import DatasetForestCoverType
 # import the model for LAL strategy
 from Classes.lal_model import LALmodel
-# import Experiment and Result classes that will be responsible for running AL and saving the results
-from Classes.experiment import Experiment
+from Classes.lal_forest import loadForest
+# import the parallel runner and the Result class that will be responsible for running AL and saving the results
+from Classes.parallel_experiment import ParallelExperiment, LearnerSpec
 from Classes.results import Results
 
+# the regressors are fitted once and exported by export_lal_models.py, which replaces the pickled LALmodel file that
+# this script used to write, here their node arrays are memory-mapped
 fn = 'LAL-randomtree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 2000, 'depth': 40, 'feat': 6 }
-filename = './lal datasets/'+fn
-regression_data = np.load(filename)
-regression_features = regression_data['arr_0']
-regression_labels = regression_data['arr_1']
-
-print('Building lal regression model..')
-lalModel1 = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'], 
-                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
-
-lalModel1.fit(regression_features, np.ravel(regression_labels))    
-
-
-print('Done!')
-print('Oob score = ', lalModel1.oob_score_)
-
-with open('LALmodel','wb') as f:
-    pickle.dump(lalModel1, f)
-
-print('successfully save model')
+lalModel1 = loadForest('./lal models/'+fn[:-4])
 
 
 
 # LALiterative strategy
 
 fn = 'LAL-iterativetree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 1000, 'depth': 40, 'feat': 6 }
-filename = './lal datasets/'+fn
-regression_data = np.load(filename)
-regression_features = regression_data['arr_0']
-regression_labels = regression_data['arr_1']
-
-print('Building lal regression model..')
-lalModel2 = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'], 
-                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
-
-lalModel2.fit(regression_features, np.ravel(regression_labels))    
-
-print('Done!')
-print('Oob score = ', lalModel2.oob_score_)
+lalModel2 = loadForest('./lal models/'+fn[:-4])
 
 
 
@@ -80,33 +49,29 @@ nIterations = 100
 # the quality metrics computed on the test set to evaluate active learners
 quality_metrics = ['accuracy']
 
-# load dataset
-dtst = DatasetForestCoverType()
-# other possible datasets: dtst = DatasetCheckerboard4x4(), dtst = DatasetRotatedCheckerboard2x2(), dtst = DatasetStriatumMini()
-# set the starting point
-dtst.setStartState(nStart)
-# Active learning strategies
-alR = ActiveLearnerRandom(dtst, nEstimators, 'random')
-alU = ActiveLearnerUncertainty(dtst, nEstimators, 'uncertainty')
-alLALindepend = ActiveLearnerLAL(dtst, nEstimators, 'lal-rand', lalModel1)
-alLALiterative = ActiveLearnerLAL(dtst, nEstimators, 'lal-iter', lalModel2)
-als = [alR, alU, alLALindepend, alLALiterative]
-
-exp = Experiment(nIterations, nEstimators, quality_metrics, dtst, als, 'here we can put a comment about the current experiments')
-# the Results class helps to add, save and plot results of the experiments
-res = Results(exp, nExperiments)
-
-for i in range(nExperiments):
-    print('\n experiment #'+str(i+1))
-    # run an experiment
-    performance = exp.run()
-    res.addPerformance(performance)
-    # reset the experiment (including sampling a new starting state for the dataset)
-    exp.reset()
-
-print()    
-res.saveResults('checkerboard4x4-exp')
-
-res2plot = Results()
-res2plot.readResult('checkerboard4x4-exp')
-res2plot.plotResults(metrics = ['accuracy'])
+# cores for the whole run and threads of the forests in every task
+nCores = None
+nJobs = 1
+seed = 805
+
+# the workers of the pool run this script again as a module, the experiment only runs in the main process
+if __name__ == '__main__':
+    # the dataset is built in every worker, other possible datasets: DatasetCheckerboard4x4, DatasetRotatedCheckerboard2x2, DatasetStriatumMini
+    # Active learning strategies, built in the workers for every (replica, learner) task with its own random stream
+    als = [LearnerSpec(ActiveLearnerRandom, 'random'),
+           LearnerSpec(ActiveLearnerUncertainty, 'uncertainty'),
+           LearnerSpec(ActiveLearnerLAL, 'lal-rand', lalModel1),
+           LearnerSpec(ActiveLearnerLAL, 'lal-iter', lalModel2)]
+
+    exp = ParallelExperiment(nIterations, nEstimators, quality_metrics, DatasetForestCoverType, als, nStart, 'here we can put a comment about the current experiments', seed=seed)
+    # the Results class helps to add, save and plot results of the experiments
+    res = Results(exp, nExperiments)
+    for performance in exp.run(nExperiments, nCores, nJobs):
+        res.addPerformance(performance)
+
+    print()
+    res.saveResults('checkerboard4x4-exp')
+
+    res2plot = Results()
+    res2plot.readResult('checkerboard4x4-exp')
+    res2plot.plotResults(metrics = ['accuracy'])
@@ -3,335 +3,307 @@ from sklearn import metrics
 from sklearn.ensemble import RandomForestRegressor
 from scipy import stats
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.cluster import MiniBatchKMeans
 import time
 
+from .incremental_forest import IncrementalRandomForestClassifier
+from .evaluation import evaluate
+from .lal_features import getLALfeatures
+from .lal_forest import FlatForest, flattenForest
+from .timing import PhaseTimer
+
 
 class ActiveLearner:
     '''This is the base class for active learning models'''
 
-    def __init__(self, dataset, nEstimators, name):
+    def __init__(self, dataset, nEstimators, name, incremental=False):
         '''input: dataset -- an object of class Dataset or any inheriting classes
                   nEstimators -- the number of estimators for the base classifier, usually set to 50
-                  name -- name of the method for saving the results later'''
+                  name -- name of the method for saving the results later
+                  incremental -- if True, the base classifier is updated with the newly labelled points instead of being retrained from scratch'''
         
         self.dataset = dataset
-        self.indicesKnown = dataset.indicesKnown
-        self.indicesUnknown = dataset.indicesUnknown
+        # labelled and unlabelled points of this learner, a private copy of the starting state of the dataset
+        self.pool = dataset.pool.copy()
         # base classification model
         self.nEstimators = nEstimators
-        self.model = RandomForestClassifier(self.nEstimators, n_jobs=8)
+        self.incremental = incremental
+        self.model = self._buildModel()
         self.name = name
+        # number of labelled points the current model was trained on, the labelled points of pool only grow at the end
+        self.nTrained = 0
+        # wall and CPU time of the phases of the iterations, read by the experiments after every iteration
+        self.timer = PhaseTimer()
+        
+        
+    @property
+    def indicesKnown(self):
+        '''indices of the labelled datapoints, a view of pool'''
+        return self.pool.known
+        
+        
+    @property
+    def indicesUnknown(self):
+        '''indices of the unlabelled datapoints, a view of pool'''
+        return self.pool.unknown
         
         
     def reset(self):
         
         '''forget all the points sampled by active learning and set labelled and unlabelled sets to default of the dataset'''
-        self.indicesKnown = self.dataset.indicesKnown
-        self.indicesUnknown = self.dataset.indicesUnknown
+        self.pool = self.dataset.pool.copy()
+        self.nTrained = 0
         
         
     def train(self):
         
         '''train the base classification model on currently available datapoints'''
-        trainDataKnown = self.dataset.trainData[self.indicesKnown,:]
-        trainLabelsKnown = self.dataset.trainLabels[self.indicesKnown,:]
-        trainLabelsKnown = np.ravel(trainLabelsKnown)
-        self.model = self.model.fit(trainDataKnown, trainLabelsKnown)
+        if self.incremental and self.nTrained>0:
+            # only the points labelled since the last training are added to the forest
+            indicesNew = self.indicesKnown[self.nTrained:]
+            if np.size(indicesNew)>0:
+                self.model = self.model.partial_fit(self.dataset.trainData[indicesNew,:], np.ravel(self.dataset.trainLabels[indicesNew,:]))
+        else:
+            trainDataKnown = self.dataset.trainData[self.indicesKnown,:]
+            trainLabelsKnown = self.dataset.trainLabels[self.indicesKnown,:]
+            trainLabelsKnown = np.ravel(trainLabelsKnown)
+            self.model = self.model.fit(trainDataKnown, trainLabelsKnown)
+        self.nTrained = self.pool.nKnown
+        
+        
+    def _buildModel(self, oob_score=False):
+        
+        '''the base classification model: a random forest that is retrained from scratch or updated incrementally'''
+        if self.incremental:
+            return IncrementalRandomForestClassifier(self.nEstimators, oob_score=oob_score, n_jobs=8)
+        return RandomForestClassifier(self.nEstimators, oob_score=oob_score, n_jobs=8)
         
         
-    def evaluate(self, performanceMeasures):
+    def evaluate(self, performanceMeasures, chunkSize=None):
         
         '''evaluate the performance of current classification for a given set of performance measures
-        input: performanceMeasures -- a list of performance measure that we would like to estimate. Possible values are 'accuracy', 'TN', 'TP', 'FN', 'FP', 'auc' 
+        input: performanceMeasures -- a list of performance measure that we would like to estimate. Possible values are 'accuracy', 'TN', 'TP', 'FN', 'FP', 'auc', 'IoU', 'dice', 'f-measure'
+               chunkSize -- if given, the test set is evaluated in chunks of chunkSize datapoints
         output: performance -- a dictionary with performanceMeasures as keys and values consisting of lists with values of performace measure at all iterations of the algorithm'''
-        performance = {}
-        test_prediction = self.model.predict(self.dataset.testData)   
-        m = metrics.confusion_matrix(self.dataset.testLabels,test_prediction)
+        # all the measures come from a single predict_proba pass over the test set
+        return evaluate(self.model, self.dataset.testData, self.dataset.testLabels, performanceMeasures, chunkSize)
+    
+    
+    def _selectTopK(self, scores, k, diversity=0, indices=None):
+        
+        '''select k unlabelled datapoints with the highest scores
+        input: scores -- the score of every datapoint in indices
+               k -- the number of datapoints to select
+               diversity -- weight of the penalty for selecting datapoints that are close to the already selected ones, 0 for plain top-k
+               indices -- the indices of the scored datapoints, indicesUnknown by default
+        output: selectedIndex1toN -- positions of the selected datapoints in scores, the best first'''
+        if indices is None:
+            indices = self.indicesUnknown
+        scores = np.ravel(np.asarray(scores))
+        k = min(k, np.size(scores))
+        if k==1 and diversity==0:
+            return np.array([np.argmax(scores)])
+        if diversity==0:
+            top = np.argpartition(-scores, k-1)[:k]
+            return top[np.argsort(-scores[top], kind='mergesort')]
+        
+        # greedy selection among the best candidates: the score of every candidate is reduced by its similarity to the closest selected datapoint
+        nCandidates = min(np.size(scores), 10*k)
+        candidates = np.argpartition(-scores, nCandidates-1)[:nCandidates]
+        candidateScores = scores[candidates]
+        # bring the scores of all strategies to [0, 1] so that diversity has the same meaning for all of them
+        if np.ptp(candidateScores)>0:
+            candidateScores = (candidateScores-np.min(candidateScores))/np.ptp(candidateScores)
+        candidateData = self.dataset.trainData[indices[candidates],:]
+        similarity = np.zeros(nCandidates)
+        selected = []
+        for i in range(k):
+            penalisedScores = candidateScores-diversity*similarity
+            penalisedScores[selected] = -np.inf
+            best = np.argmax(penalisedScores)
+            selected.append(best)
+            similarity = np.maximum(similarity, np.exp(-np.sum((candidateData-candidateData[best])**2, axis=1)))
+        return candidates[selected]
+    
+    
+    def _addToKnown(self, selectedIndex1toN):
         
-        if 'accuracy' in performanceMeasures:
-            performance['accuracy'] = metrics.accuracy_score(self.dataset.testLabels,test_prediction)
-            
-        if 'TN' in performanceMeasures:
-            performance['TN'] = m[0,0]
-        if 'FN' in performanceMeasures:    
-            performance['FN'] = m[1,0]
-        if 'TP' in performanceMeasures:    
-            performance['TP'] = m[1,1]
-        if 'FP' in performanceMeasures:
-            performance['FP'] = m[0,1]
-            
-        if 'auc' in performanceMeasures:
-            test_prediction = self.model.predict_proba(self.dataset.testData)  
-            test_prediction = test_prediction[:,1]
-            performance['auc'] = metrics.roc_auc_score(self.dataset.testLabels, test_prediction)
-            
-        return performance
+        '''move the datapoints at positions selectedIndex1toN of indicesUnknown to the labelled set'''
+        self.pool.addUnknownAt(selectedIndex1toN)
     
         
 class ActiveLearnerRandom(ActiveLearner):
     '''Randomly samples the points'''
     
-    def selectNext(self):
+    def selectNext(self, k=1, diversity=0):
                 
-        self.indicesUnknown = np.random.permutation(self.indicesUnknown)
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([self.indicesUnknown[0]])]));            
-        self.indicesUnknown = self.indicesUnknown[1:]
+        # random samples are diverse by themselves, so there is no diversity penalty
+        self.pool.addRandom(k)
         
         
 class ActiveLearnerUncertainty(ActiveLearner):
     '''Points are sampled according to uncertainty sampling criterion'''
     
-    def selectNext(self):
+    def selectNext(self, k=1, diversity=0):
                 
         # predict for the rest the datapoints
         unknownPrediction = self.model.predict_proba(self.dataset.trainData[self.indicesUnknown,:])[:,0]
-        selectedIndex1toN = np.argsort(np.absolute(unknownPrediction-0.5))[0]
-        selectedIndex = self.indicesUnknown[selectedIndex1toN]
-                
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([selectedIndex])]))
-        self.indicesUnknown = np.delete(self.indicesUnknown, selectedIndex1toN)  
+        # the most uncertain datapoints are the closest to 0.5
+        selectedIndex1toN = self._selectTopK(-np.absolute(unknownPrediction-0.5), k, diversity)
+        self._addToKnown(selectedIndex1toN)
         
         
 class ActiveLearnerLAL(ActiveLearner):
     '''Points are sampled according to a method described in K. Konyushkova, R. Sznitman, P. Fua 'Learning Active Learning from data'  '''
     
-    def __init__(self, dataset, nEstimators, name, lalModel):
-        
-        ActiveLearner.__init__(self, dataset, nEstimators, name)
-        self.model = RandomForestClassifier(self.nEstimators, oob_score=True, n_jobs=8)
+    def __init__(self, dataset, nEstimators, name, lalModel, incremental=False, candidates='all', maxCandidates=1000, specializeRegressor=False):
+        '''input: lalModel -- the regressor that predicts the reduction of the error from the LAL features, possibly a FlatForest
+                             loaded by loadForest, which is always specialized
+                  candidates -- how the unlabelled datapoints scored by lalModel are chosen in every iteration:
+                                'all' -- all of them
+                                'random' -- a random subsample
+                                'uncertainty' -- the most uncertain datapoints of a random subsample 10 times bigger
+                                'cluster' -- the unlabelled datapoint closest to the centre of every cluster of the training data
+                  maxCandidates -- the maximal number of candidates, so that the cost of a query does not grow with the pool
+                  specializeRegressor -- if True, the forest regressor lalModel is specialized in every query on the features
+                                         that are the same for all the candidates, which gives the same predictions faster'''
+        
+        ActiveLearner.__init__(self, dataset, nEstimators, name, incremental)
+        self.model = self._buildModel(oob_score=True)
         self.lalModel = lalModel
+        # the forest regressor casts its input to float32, so computing the features in float32 does not change its predictions
+        self.featuresDtype = np.float32
+        self.candidates = candidates
+        self.maxCandidates = maxCandidates
+        # clusters of the training data for candidates='cluster', built at the first query
+        self.clusterMembers = None
+        if isinstance(lalModel, FlatForest):
+            self.flatModel = lalModel
+        elif specializeRegressor:
+            self.flatModel = flattenForest(lalModel)
+        else:
+            self.flatModel = None
+        
+    def reset(self):
+        
+        ActiveLearner.reset(self)
+        if self.clusterMembers is not None:
+            self.clusterNext[:] = self.clusterStart[:-1]
     
-    def get_basemodel_sample_data(self):
+    def get_basemodel_sample_data(self, positions=None):
         """
             obtain the information about the base_classfication and the unlabel data 
+            positions -- the positions in indicesUnknown of the datapoints to compute the features for, all of them by default
         """
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
+        if positions is None:
+            unknown_data = self.dataset.trainData[self.indicesUnknown,:]
+        else:
+            unknown_data = self.dataset.trainData[self.indicesUnknown[positions],:]
         known_labels = self.dataset.trainLabels[self.indicesKnown,:]
         n_lablled = np.size(self.indicesKnown)
         n_dim = np.shape(self.dataset.trainData)[1]
         
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
+        LALfeatures = getLALfeatures(self.model, unknown_data, known_labels, n_lablled, n_dim, dtype=self.featuresDtype)
 
         return LALfeatures
         
-    def selectNext(self):
-        
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
-        known_labels = self.dataset.trainLabels[self.indicesKnown,:]
-        n_lablled = np.size(self.indicesKnown)
-        n_dim = np.shape(self.dataset.trainData)[1]
+    def selectNext(self, k=1, diversity=0):
         
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
+        with self.timer.phase('candidates'):
+            positions = self._candidatePositions(k)
+        with self.timer.phase('features'):
+            LALfeatures = self.get_basemodel_sample_data(positions)
             
         # predict the expercted reduction in the error by adding the point
-        LALprediction = self.lalModel.predict(LALfeatures)
-        # select the datapoint with the biggest reduction in the error
-        selectedIndex1toN = np.argmax(LALprediction)
-        # retrieve the real index of the selected datapoint    
-        selectedIndex = self.indicesUnknown[selectedIndex1toN]
-            
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([selectedIndex])]))
-        self.indicesUnknown = np.delete(self.indicesUnknown, selectedIndex1toN)  
+        with self.timer.phase('regressor'):
+            LALprediction = self._predictLAL(LALfeatures)
+        # select the datapoints with the biggest reduction in the error
+        if positions is None:
+            selectedIndex1toN = self._selectTopK(LALprediction, k, diversity)
+        else:
+            selectedIndex1toN = positions[self._selectTopK(LALprediction, k, diversity, self.indicesUnknown[positions])]
+        self._addToKnown(selectedIndex1toN)
+        
+    def _predictLAL(self, LALfeatures):
+        
+        '''the prediction of lalModel, computed by its specialization on the constant features if specializeRegressor is set'''
+        if self.flatModel is None or np.shape(LALfeatures)[0]==0:
+            return self.lalModel.predict(LALfeatures)
+        # all the features but the first two are the same for all the datapoints of a query
+        specialized = self.flatModel.specialize({f: LALfeatures[0,f] for f in range(2, np.shape(LALfeatures)[1])})
+        # tabulating the specialized forest pays off only if the grid has fewer cells than there are candidates
+        grid = specialized.lookupGrid(maxCells=np.shape(LALfeatures)[0])
+        if grid is not None:
+            return grid.predict(LALfeatures)
+        return specialized.compile().predict(LALfeatures)
+        
+    def _candidatePositions(self, k):
+        
+        '''the positions in indicesUnknown of the candidates of this query, None for all the unlabelled datapoints'''
+        nUnknown = self.pool.nUnknown
+        nCandidates = max(self.maxCandidates, k)
+        if self.candidates=='all' or nUnknown<=nCandidates:
+            return None
+        if self.candidates=='random':
+            # sampling with replacement and dropping the repetitions costs O(nCandidates), a permutation of the pool costs O(nUnknown)
+            return np.unique(np.random.randint(nUnknown, size=nCandidates))
+        if self.candidates=='uncertainty':
+            # the base forest is much cheaper than the features and the LAL regressor, it pre-filters a bigger subsample
+            if nUnknown<=10*nCandidates:
+                sample = np.arange(nUnknown)
+            else:
+                sample = np.unique(np.random.randint(nUnknown, size=10*nCandidates))
+            prediction = self.model.predict_proba(self.dataset.trainData[self.indicesUnknown[sample],:])[:,0]
+            return sample[np.argpartition(np.absolute(prediction-0.5), nCandidates-1)[:nCandidates]]
+        if self.candidates=='cluster':
+            return self._clusterCandidates(nCandidates)
+        raise ValueError('unknown candidates mode: %s' % self.candidates)
+        
+    def _clusterCandidates(self, nCandidates):
+        
+        '''the unlabelled datapoint closest to the centre of every cluster'''
+        if self.clusterMembers is None:
+            self._buildClusters(nCandidates)
+        knownMask = self.pool.knownMask
+        indices = []
+        for c in range(np.size(self.clusterNext)):
+            # the members of a cluster are sorted by the distance to its centre and labelled points are never unlabelled again,
+            # so the pointer to the first unlabelled member only moves forward
+            end = self.clusterStart[c+1]
+            while self.clusterNext[c]<end and knownMask[self.clusterMembers[self.clusterNext[c]]]:
+                self.clusterNext[c] += 1
+            if self.clusterNext[c]<end:
+                indices.append(self.clusterMembers[self.clusterNext[c]])
+        return self.pool.position[indices]-self.pool.nKnown
+        
+    def _buildClusters(self, nClusters):
+        
+        trainData = self.dataset.trainData
+        kmeans = MiniBatchKMeans(n_clusters=nClusters, batch_size=max(1024, 3*nClusters), n_init=3).fit(trainData)
+        distance = np.sum((trainData-kmeans.cluster_centers_[kmeans.labels_])**2, axis=1)
+        # the members of all the clusters in one array, cluster by cluster and the closest to the centre first
+        self.clusterMembers = np.lexsort((distance, kmeans.labels_)).astype(np.int32)
+        self.clusterStart = np.searchsorted(kmeans.labels_[self.clusterMembers], np.arange(nClusters+1))
+        self.clusterNext = np.copy(self.clusterStart[:-1])
 
 
-class ActiveLearnerSGD(ActiveLearner):
-    '''Points are sampled according to a method described in K. Konyushkova, R. Sznitman, P. Fua 'Learning Active Learning from data'  '''
-    
-    def __init__(self, dataset, nEstimators, name, SGD):
-        
-        ActiveLearner.__init__(self, dataset, nEstimators, name)
-        self.model = RandomForestClassifier(self.nEstimators, oob_score=True, n_jobs=8)
-        self.lalModel = SGD
+class ActiveLearnerSGD(ActiveLearnerLAL):
+    '''Points are sampled according to a method described in K. Konyushkova, R. Sznitman, P. Fua 'Learning Active Learning from data'
+    with a linear (SGD) regressor in place of the random forest regressor'''
     
-    def get_basemodel_sample_data(self):
-        """
-            obtain the information about the base_classfication and the unlabel data 
-        """
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
-        known_labels = self.dataset.trainLabels[self.indicesKnown,:]
-        n_lablled = np.size(self.indicesKnown)
-        n_dim = np.shape(self.dataset.trainData)[1]
+    def __init__(self, dataset, nEstimators, name, SGD, incremental=False):
         
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
+        ActiveLearnerLAL.__init__(self, dataset, nEstimators, name, SGD, incremental)
+        # linear regressors work in the precision of their input
+        self.featuresDtype = np.float64
 
-        return LALfeatures
-        
-    def selectNext(self):
-        
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
-        known_labels = self.dataset.trainLabels[self.indicesKnown,:]
-        n_lablled = np.size(self.indicesKnown)
-        n_dim = np.shape(self.dataset.trainData)[1]
-        
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
-            
-        # predict the expercted reduction in the error by adding the point
-        LALprediction = self.lalModel.predict(LALfeatures)
-        # select the datapoint with the biggest reduction in the error
-        selectedIndex1toN = np.argmax(LALprediction)
-        # retrieve the real index of the selected datapoint    
-        selectedIndex = self.indicesUnknown[selectedIndex1toN]
-            
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([selectedIndex])]))
-        self.indicesUnknown = np.delete(self.indicesUnknown, selectedIndex1toN)  
 
-class AL_Linear(ActiveLearner):
-    '''Points are sampled according to a method described in K. Konyushkova, R. Sznitman, P. Fua 'Learning Active Learning from data'  '''
-    
-    def __init__(self, dataset, nEstimators, name, SGD):
-        
-        ActiveLearner.__init__(self, dataset, nEstimators, name)
-        self.model = RandomForestClassifier(self.nEstimators, oob_score=True, n_jobs=8)
-        self.lalModel = SGD
+class AL_Linear(ActiveLearnerLAL):
+    '''Points are sampled according to a method described in K. Konyushkova, R. Sznitman, P. Fua 'Learning Active Learning from data'
+    with a linear regressor in place of the random forest regressor'''
     
-    def get_basemodel_sample_data(self):
-        """
-            obtain the information about the base_classfication and the unlabel data 
-        """
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
-        known_labels = self.dataset.trainLabels[self.indicesKnown,:]
-        n_lablled = np.size(self.indicesKnown)
-        n_dim = np.shape(self.dataset.trainData)[1]
-        
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
-
-        return LALfeatures
+    def __init__(self, dataset, nEstimators, name, SGD, incremental=False):
         
-    def selectNext(self):
-        
-        unknown_data = self.dataset.trainData[self.indicesUnknown,:]
-        known_labels = self.dataset.trainLabels[self.indicesKnown,:]
-        n_lablled = np.size(self.indicesKnown)
-        n_dim = np.shape(self.dataset.trainData)[1]
-        
-        # predictions of the trees
-        temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in self.model.estimators_])
-        # - average and standard deviation of the predicted scores
-        f_1 = np.mean(temp, axis=0)
-        f_2 = np.std(temp, axis=0)
-        # - proportion of positive points
-        f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
-        # the score estimated on out of bag estimate
-        f_4 = self.model.oob_score_*np.ones_like(f_1)
-        # - coeficient of variance of feature importance
-        f_5 = np.std(self.model.feature_importances_/n_dim)*np.ones_like(f_1)
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in self.model.estimators_]))*np.ones_like(f_1)
-        # - number of already labelled datapoints
-        f_8 = np.size(self.indicesKnown)*np.ones_like(f_1)
-        
-        # all the featrues put together for regressor
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        LALfeatures = np.transpose(LALfeatures)
-            
-        # predict the expercted reduction in the error by adding the point
-        LALprediction = self.lalModel.predict(LALfeatures)
-        # select the datapoint with the biggest reduction in the error
-        selectedIndex1toN = np.argmax(LALprediction)
-        # retrieve the real index of the selected datapoint    
-        selectedIndex = self.indicesUnknown[selectedIndex1toN]
-            
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([selectedIndex])]))
-        self.indicesUnknown = np.delete(self.indicesUnknown, selectedIndex1toN)  
+        ActiveLearnerLAL.__init__(self, dataset, nEstimators, name, SGD, incremental)
+        # linear regressors work in the precision of their input
+        self.featuresDtype = np.float64
@@ -11,6 +11,9 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.preprocessing import StandardScaler
 from sklearn.preprocessing import Imputer
 
+from .index_pool import IndexPool
+from .dataset_cache import cacheDataset, cachedArray
+
 
 class Dataset:
     
@@ -32,19 +35,29 @@ class Dataset:
         # first get 1 positive and 1 negative point so that both classes are represented and initial classifer could be trained.
         cl1 = np.nonzero(self.trainLabels==1)[0]
         indices1 = np.random.permutation(cl1)
-        self.indicesKnown = np.array([indices1[0]]);
+        indicesKnown = np.array([indices1[0]]);
         cl2 = np.nonzero(self.trainLabels==0)[0]
         indices2 = np.random.permutation(cl2)
-        self.indicesKnown = np.concatenate(([self.indicesKnown, np.array([indices2[0]])]));
+        indicesKnown = np.concatenate(([indicesKnown, np.array([indices2[0]])]));
         # combine all the rest of the indices that have not been sampled yet
         indicesRestAll = np.concatenate(([indices1[1:], indices2[1:]]));
         # permute them
         indicesRestAll = np.random.permutation(indicesRestAll)
         # if we need more than 2 datapoints, select the rest nStart-2 at random
         if nStart>2:
-            self.indicesKnown = np.concatenate(([self.indicesKnown, indicesRestAll[0:nStart-2]]));             
+            indicesKnown = np.concatenate(([indicesKnown, indicesRestAll[0:nStart-2]]));             
         # the rest of the points will be unlabeled at the beginning
-        self.indicesUnknown = indicesRestAll[nStart-2:]
+        self.pool = IndexPool(indicesKnown, indicesRestAll[nStart-2:], np.shape(self.trainData)[0])
+        
+    @property
+    def indicesKnown(self):
+        '''indices of the labelled datapoints, a view of pool'''
+        return self.pool.known
+        
+    @property
+    def indicesUnknown(self):
+        '''indices of the unlabelled datapoints, a view of pool'''
+        return self.pool.unknown
         
 
 class DatasetCheckerboard2x2(Dataset):
@@ -54,6 +67,9 @@ class DatasetCheckerboard2x2(Dataset):
     def __init__(self):
         
         Dataset.__init__(self)
+        cacheDataset(self, ['./data/checkerboard2x2_train.npz', './data/checkerboard2x2_test.npz'])
+        
+    def load(self):
                 
         filename = './data/checkerboard2x2_train.npz'
         dt = np.load(filename)
@@ -77,6 +93,9 @@ class DatasetCheckerboard4x4(Dataset):
     def __init__(self):
         
         Dataset.__init__(self)
+        cacheDataset(self, ['./data/checkerboard4x4_train.npz', './data/checkerboard4x4_test.npz'])
+        
+    def load(self):
           
         filename = './data/checkerboard4x4_train.npz'
         dt = np.load(filename)
@@ -100,6 +119,9 @@ class DatasetRotatedCheckerboard2x2(Dataset):
     def __init__(self):
         
         Dataset.__init__(self)
+        cacheDataset(self, ['./data/rotated_checkerboard2x2_train.npz', './data/rotated_checkerboard2x2_test.npz'])
+        
+    def load(self):
                 
         filename = './data/rotated_checkerboard2x2_train.npz'
         dt = np.load(filename)
@@ -165,6 +187,9 @@ class DatasetStriatumMini(Dataset):
     def __init__(self):
         
         Dataset.__init__(self)
+        cacheDataset(self, ['./data/striatum_train_features_mini.mat', './data/striatum_train_labels_mini.mat', './data/striatum_test_features_mini.mat', './data/striatum_test_labels_mini.mat'])
+        
+    def load(self):
 
         filename = './data/striatum_train_features_mini.mat'
         dt = sio.loadmat(filename)
@@ -193,7 +218,11 @@ class DatasetForestCoverType(Dataset):
     """
 
     def __init__(self):
+        
         Dataset.__init__(self)
+        cacheDataset(self, ['./data/Forest_Cover_Type_train.npz'])
+        
+    def load(self):
 
         f1 = './data/Forest_Cover_Type_train.npz'
         data = np.load(f1)
@@ -216,7 +245,8 @@ class DatasetBreast(Dataset):
         Dataset.__init__(self)
 
         filename = './data/binary_classification/breast-w.csv'
-        data = genfromtxt(filename, delimiter=',', dtype=np.str)
+        # only the parsing is cached, the random split and the scaling are done in every construction
+        data = cachedArray(self, [filename], lambda: genfromtxt(filename, delimiter=',', dtype=np.str).astype(np.float))
         samplesindex = np.arange(np.shape(data)[0])
         np.random.shuffle(samplesindex)
 
@@ -242,7 +272,8 @@ class DatasetDiabetes(Dataset):
         Dataset.__init__(self)
 
         filename = './data/binary_classification/diabetes.csv'
-        data = genfromtxt(filename, delimiter=',', dtype=np.str)
+        # only the parsing is cached, the random split and the scaling are done in every construction
+        data = cachedArray(self, [filename], lambda: genfromtxt(filename, delimiter=',', dtype=np.str).astype(np.float))
         samplesindex = np.arange(np.shape(data)[0])
         np.random.shuffle(samplesindex)
 
@@ -268,7 +299,8 @@ class Datasetwaveform_5000_1_2(Dataset):
         Dataset.__init__(self)
 
         filename = './data/binary_classification/waveform-5000_1_2.csv'
-        data = genfromtxt(filename, delimiter=',', dtype=np.str)
+        # only the parsing is cached, the random split and the scaling are done in every construction
+        data = cachedArray(self, [filename], lambda: genfromtxt(filename, delimiter=',', dtype=np.str).astype(np.float))
         samplesindex = np.arange(np.shape(data)[0])
         np.random.shuffle(samplesindex)
 
@@ -308,7 +340,8 @@ class Datasetclean1(Dataset):
         Dataset.__init__(self)
 
         filename = './data/binary_classification/clean1.csv'
-        data = genfromtxt(filename, delimiter=',', dtype=np.str)
+        # only the parsing is cached, the random split and the scaling are done in every construction
+        data = cachedArray(self, [filename], lambda: genfromtxt(filename, delimiter=',', dtype=np.str).astype(np.float))
         samplesindex = np.arange(np.shape(data)[0])
         np.random.shuffle(samplesindex)
 
@@ -0,0 +1,115 @@
+import argparse
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+
+# the folder of the cache, relative to the folder the experiments are run from like the data itself
+CACHE_FOLDER = './data/cache'
+# the arrays of a dataset that are cached
+ARRAYS = ['trainData', 'trainLabels', 'testData', 'testLabels']
+# change it when the format of the cache or the preprocessing of the datasets changes
+VERSION = 1
+
+
+def cacheDataset(dataset, sources, dtype=np.float32, folder=CACHE_FOLDER):
+    '''Set the arrays of a deterministic dataset from the cache, or load them with dataset.load() and cache them.
+    The cache is keyed by the contents of the source files, so it is rebuilt when they change, and the cached arrays are
+    opened as read-only memory maps (mmap_mode='r'): code that modifies trainData, trainLabels, testData or testLabels
+    in place raises an error and has to work on a copy. The caches of older source files are kept until --clear or
+    --rebuild, since other processes may still map them.
+    input: dataset -- an object of class Dataset with a method load that sets trainData, trainLabels, testData, testLabels
+           sources -- the files the dataset is loaded from
+           dtype -- dtype of the cached trainData and testData'''
+
+    path = os.path.join(folder, type(dataset).__name__, _sourcesKey(sources, dtype))
+    if not os.path.isdir(path):
+        dataset.load()
+        arrays = dict()
+        for name in ARRAYS:
+            arrays[name] = getattr(dataset, name)
+            if name in ['trainData', 'testData']:
+                arrays[name] = arrays[name].astype(dtype)
+        _write(path, arrays)
+    for name in ARRAYS:
+        setattr(dataset, name, np.load(os.path.join(path, name+'.npy'), mmap_mode='r'))
+
+
+def cachedArray(dataset, sources, load, folder=CACHE_FOLDER):
+    '''An array parsed from the source files, from the cache or computed by load() and cached.
+    Used by the datasets that split their data at random in the constructor: only the parsing is cached, the split and
+    the scaling are still done in every construction, with the same random draws as without the cache.
+    The array is a read-only memory map like the arrays of cacheDataset.'''
+
+    path = os.path.join(folder, type(dataset).__name__, _sourcesKey(sources, None))
+    if not os.path.isdir(path):
+        _write(path, {'data': load()})
+    return np.load(os.path.join(path, 'data.npy'), mmap_mode='r')
+
+
+def clearCache(names=None, folder=CACHE_FOLDER):
+    '''Remove the cache of the datasets with the given class names, of all the datasets by default
+    output: the names of the removed datasets'''
+
+    if not os.path.isdir(folder):
+        return []
+    if names is None:
+        names = sorted(os.listdir(folder))
+    removed = []
+    for name in names:
+        if os.path.isdir(os.path.join(folder, name)):
+            shutil.rmtree(os.path.join(folder, name))
+            removed.append(name)
+    return removed
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+def _sourcesKey(sources, dtype):
+
+    sha = hashlib.sha1()
+    sha.update(('%d %s' % (VERSION, np.dtype(dtype).str if dtype is not None else '')).encode())
+    for filename in sources:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                sha.update(block)
+    return sha.hexdigest()
+
+
+def _write(path, arrays):
+
+    # write next to the final folder and rename it, so that a concurrent process never sees a half-written cache
+    tmp = path+'.tmp%d' % os.getpid()
+    os.makedirs(tmp)
+    for name in arrays:
+        np.save(os.path.join(tmp, name+'.npy'), np.ascontiguousarray(arrays[name]))
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # another process has written the same cache meanwhile
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+
+    # python -m Classes.dataset_cache --clear [names]    removes the cache of the given datasets or of all of them
+    # python -m Classes.dataset_cache --rebuild [names]  removes it and builds it again, for the datasets that were cached by default
+    parser = argparse.ArgumentParser(description='Cache of the parsed and scaled datasets in '+CACHE_FOLDER)
+    parser.add_argument('--clear', action='store_true', help='remove the cache')
+    parser.add_argument('--rebuild', action='store_true', help='remove the cache and build it again')
+    parser.add_argument('names', nargs='*', help='class names of the datasets, all the cached datasets by default')
+    args = parser.parse_args()
+
+    from . import dataset
+    names = args.names if args.names else None
+    if args.clear or args.rebuild:
+        removed = clearCache(names)
+        print('removed the cache of', ', '.join(removed) if removed else 'no dataset')
+        if args.rebuild:
+            for name in (names if names is not None else removed):
+                getattr(dataset, name)()
+                print('rebuilt the cache of', name)
+    else:
+        parser.print_help()
@@ -0,0 +1,68 @@
+import numpy as np
+from sklearn import metrics
+
+
+# the performance measures that evaluate can compute
+MEASURES = ['accuracy', 'TN', 'FP', 'FN', 'TP', 'auc', 'IoU', 'dice', 'f-measure']
+# the measures that are only defined for binary labels
+BINARY_MEASURES = ['TN', 'FP', 'FN', 'TP', 'auc', 'IoU', 'dice', 'f-measure']
+# added to the denominators of IoU, dice and f-measure to avoid division by zero, as in Results.plotResults
+SMALL_EPS = 0.000001
+
+
+def evaluate(model, testData, testLabels, performanceMeasures, chunkSize=None):
+    '''Evaluate a fitted classifier on a test set with a single predict_proba pass: the predicted class is the one
+    with the highest probability, as in predict, so all the measures come from one pass of the forest.
+    Only accuracy is defined when the classes of the model and of the test set are more than two, the other measures
+    of MEASURES raise a ValueError then.
+    input: model -- a fitted classifier with predict_proba and classes_, the second class is the positive one
+           testData, testLabels -- the test set, possibly memory-mapped
+           performanceMeasures -- a list of measures from MEASURES
+           chunkSize -- if given, the test set is streamed in chunks of chunkSize datapoints, only the scores of the
+                        positive class are kept for the whole set (for 'auc')
+    output: performance -- a dictionary with performanceMeasures as keys'''
+
+    testLabels = np.ravel(testLabels)
+    n = np.size(testLabels)
+    if chunkSize is None:
+        chunkSize = max(n, 1)
+    binary = np.size(np.union1d(model.classes_, np.unique(testLabels)))<=2
+    if not binary and any(measure in BINARY_MEASURES for measure in performanceMeasures):
+        raise ValueError('the measures %s are only defined for binary labels' % ', '.join(BINARY_MEASURES))
+    positive = model.classes_[-1]
+    nCorrect = 0
+    # counts of TN, FP, FN, TP
+    counts = np.zeros(4, dtype=np.int64)
+    scores = np.empty(n) if 'auc' in performanceMeasures else None
+    for start in range(0, n, chunkSize):
+        proba = model.predict_proba(testData[start:start+chunkSize])
+        prediction = model.classes_.take(np.argmax(proba, axis=1), axis=0)
+        labels = testLabels[start:start+chunkSize]
+        nCorrect += np.sum(prediction==labels)
+        if binary:
+            counts += np.bincount(2*(labels==positive)+(prediction==positive), minlength=4)
+        if scores is not None:
+            scores[start:start+chunkSize] = proba[:,-1]
+
+    TN, FP, FN, TP = counts
+    performance = {}
+    if 'accuracy' in performanceMeasures:
+        performance['accuracy'] = nCorrect/n
+    if 'TN' in performanceMeasures:
+        performance['TN'] = TN
+    if 'FP' in performanceMeasures:
+        performance['FP'] = FP
+    if 'FN' in performanceMeasures:
+        performance['FN'] = FN
+    if 'TP' in performanceMeasures:
+        performance['TP'] = TP
+    if 'auc' in performanceMeasures:
+        performance['auc'] = metrics.roc_auc_score(testLabels, scores)
+    if 'IoU' in performanceMeasures:
+        performance['IoU'] = TP/(TP+FP+FN+SMALL_EPS)
+    if 'dice' in performanceMeasures:
+        performance['dice'] = 2*TP/(2*TP+FP+FN+SMALL_EPS)
+    if 'f-measure' in performanceMeasures:
+        # the harmonic mean of precision and recall, the same as dice for binary labels
+        performance['f-measure'] = 2*TP/(2*TP+FP+FN+SMALL_EPS)
+    return performance
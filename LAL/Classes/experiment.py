@@ -1,7 +1,26 @@
+import hashlib
+import os
+import pickle as pkl
+
+import numpy as np
+
+from .lal_forest import FlatForest
+from .timing import PHASES
+
+
+# attributes of the learners that are not saved in the checkpoints
+CHECKPOINT_SHARED = ['dataset', 'lalModel', 'flatModel']
+# parameters of the learners that a checkpoint must have been saved with to be continued
+CHECKPOINT_LEARNER_PARAMETERS = ['nEstimators', 'incremental', 'candidates', 'maxCandidates']
+
+
 class Experiment:
     '''The class that runs active learning experiment'''
     
-    def __init__(self, nIterations, nEstimators, performanceMeasures, dataset, alearners, comment=''):
+    def __init__(self, nIterations, nEstimators, performanceMeasures, dataset, alearners, comment='', batchSize=1, diversity=0):
+        '''input: nIterations -- the number of rounds of active learning, every round labels batchSize datapoints and retrains the learners once
+                  batchSize -- the number of datapoints that every learner selects in one round
+                  diversity -- weight of the penalty for selecting similar datapoints in one round'''
         
         self.nIterations = nIterations
         self.nEstimators = nEstimators
@@ -9,6 +28,8 @@ class Experiment:
         self.dataset = dataset
         self.alearners = alearners
         self.comment = comment
+        self.batchSize = batchSize
+        self.diversity = diversity
         self.performances = dict()
         for alearner in self.alearners:
             self.performances[alearner.name] = dict()
@@ -16,19 +37,60 @@ class Experiment:
                 self.performances[alearner.name][performanceMeasure] = []
 
         
-    def run(self):
-        '''Run the experiment for nIterations for all alearners and return performances'''
-        for it in range(self.nIterations):
+    def run(self, startIteration=0, checkpoint=None):
+        '''Run the experiment for nIterations for all alearners and return performances
+        input: startIteration -- the first iteration to run, when a replica is continued from a checkpoint
+               checkpoint -- a function called with the number of completed iterations after every iteration'''
+        for it in range(startIteration, self.nIterations):
             print('.', end="")
             for alearner in self.alearners:
-                alearner.train()
-                perf = alearner.evaluate(self.performanceMeasures)
-                for key in perf:
-                    self.performances[alearner.name][key].append(perf[key])
-                alearner.selectNext()
+                runIteration(alearner, self.performanceMeasures, self.performances[alearner.name], self.batchSize, self.diversity)
+            if checkpoint is not None:
+                checkpoint(it+1)
         return self.performances
     
     
+    def runAll(self, nExperiments, results, checkpointPath=None, checkpointEvery=10):
+        '''Run nExperiments replicas, add their performances to results and reset the experiment after every replica.
+        input: nExperiments -- the number of replicas
+               results -- an object of class Results for this experiment
+               checkpointPath -- if given, the state of the run is saved to this file every checkpointEvery iterations and
+                                 after every replica; a run started again with the same file skips the completed replicas
+                                 and continues the interrupted one from its last checkpoint with the same random state.
+                                 The checkpoint is only continued by a run with the same configuration (iterations,
+                                 replicas, measures, batch size, contents of the dataset, nStart, learners and their
+                                 regressors), otherwise a ValueError is raised. It is removed when the run is complete.
+               checkpointEvery -- the number of iterations between checkpoints within a replica
+        output: results'''
+        startReplica, startIteration = 0, 0
+        config = None
+        if checkpointPath is not None:
+            config = self._checkpointConfig(nExperiments)
+            if os.path.exists(checkpointPath):
+                startReplica, startIteration = self._loadCheckpoint(checkpointPath, results, config)
+                print('continuing from experiment #%d, iteration %d' % (startReplica+1, startIteration))
+        
+        for i in range(startReplica, nExperiments):
+            print('\n experiment #'+str(i+1))
+            checkpoint = None
+            if checkpointPath is not None:
+                def checkpoint(it, i=i):
+                    if it%checkpointEvery==0 and it<self.nIterations:
+                        self._saveCheckpoint(checkpointPath, results, i, it, config)
+            # run an experiment
+            performance = self.run(startIteration, checkpoint)
+            startIteration = 0
+            results.addPerformance(performance)
+            # reset the experiment (including sampling a new starting state for the dataset)
+            self.reset()
+            if checkpointPath is not None:
+                self._saveCheckpoint(checkpointPath, results, i+1, 0, config)
+        # a complete run is not continued, running it again starts from the beginning
+        if checkpointPath is not None and os.path.exists(checkpointPath):
+            os.remove(checkpointPath)
+        return results
+    
+    
     def reset(self):
         '''Reset the experiment: reset the starting datapoint of the dataset, reset alearners and performances'''
         self.dataset.setStartState(self.dataset.nStart)
@@ -40,3 +102,104 @@ class Experiment:
             self.performances[alearner.name] = dict()
             for performanceMeasure in self.performanceMeasures:
                 self.performances[alearner.name][performanceMeasure] = []
+    
+    
+    def _checkpointConfig(self, nExperiments):
+        
+        # the dataset and the regressors are given again when the run is restarted, they are compared by their contents
+        dataset = self.dataset
+        learners = []
+        for alearner in self.alearners:
+            learner = {'name': alearner.name, 'class': type(alearner).__name__}
+            for parameter in CHECKPOINT_LEARNER_PARAMETERS:
+                learner[parameter] = getattr(alearner, parameter, None)
+            if getattr(alearner, 'lalModel', None) is not None:
+                learner['lalModel'] = _digest(alearner.lalModel)
+                learner['specializeRegressor'] = alearner.flatModel is not None
+            learners.append(learner)
+        return {'nIterations': self.nIterations,
+                'nExperiments': nExperiments,
+                'performanceMeasures': list(self.performanceMeasures),
+                'batchSize': self.batchSize,
+                'diversity': self.diversity,
+                'dataset': getattr(dataset, 'name', type(dataset).__name__),
+                'datasetContents': _digest([dataset.trainData, dataset.trainLabels, dataset.testData, dataset.testLabels]),
+                'nStart': dataset.nStart,
+                'learners': learners}
+    
+    
+    def _saveCheckpoint(self, checkpointPath, results, replica, iteration, config):
+        
+        # the learners are saved without the dataset and the LAL regressor, which are given again when the run is restarted
+        learners = []
+        for alearner in self.alearners:
+            learners.append(dict((key, value) for key, value in alearner.__dict__.items() if key not in CHECKPOINT_SHARED))
+        state = {'config': config,
+                 'replica': replica,
+                 'iteration': iteration,
+                 'randomState': np.random.get_state(),
+                 'nStart': self.dataset.nStart,
+                 'pool': self.dataset.pool,
+                 'learners': learners,
+                 'performances': self.performances,
+                 'results': {'nAdded': results.nAdded, 'performances': results.performances}}
+        # write to a temporary file first so that a crash while saving does not destroy the previous checkpoint
+        with open(checkpointPath+'.tmp', 'wb') as f:
+            pkl.dump(state, f)
+        os.replace(checkpointPath+'.tmp', checkpointPath)
+        
+        
+    def _loadCheckpoint(self, checkpointPath, results, config):
+        
+        with open(checkpointPath, 'rb') as f:
+            state = pkl.load(f)
+        saved = state.get('config', {})
+        different = [key for key in config if saved.get(key)!=config[key]]
+        if different:
+            raise ValueError('the checkpoint %s was saved for another run (different %s), remove it to start again'
+                             % (checkpointPath, ', '.join(different)))
+        np.random.set_state(state['randomState'])
+        self.dataset.nStart = state['nStart']
+        self.dataset.pool = state['pool']
+        for alearner, learnerState in zip(self.alearners, state['learners']):
+            alearner.__dict__.update(learnerState)
+        self.performances = state['performances']
+        results.nAdded = state['results']['nAdded']
+        results.performances = state['results']['performances']
+        results._buffers = dict((alearner, dict((key, value) for key, value in results.performances[alearner].items() if np.size(value)>0)) for alearner in results.performances)
+        return state['replica'], state['iteration']
+
+
+def _digest(obj):
+    '''a digest of the contents of obj: of the arrays of a list of arrays, of the nodes of a FlatForest or of its pickle'''
+    sha = hashlib.sha1()
+    if isinstance(obj, FlatForest):
+        obj = [obj.feature, obj.threshold, obj.left, obj.right, obj.value, obj.roots]
+    if isinstance(obj, list):
+        for array in obj:
+            array = np.ascontiguousarray(array)
+            sha.update(('%s %s' % (array.dtype.str, array.shape)).encode())
+            sha.update(array)
+    else:
+        sha.update(pkl.dumps(obj))
+    return sha.hexdigest()
+
+
+def runIteration(alearner, performanceMeasures, performance, batchSize=1, diversity=0):
+    '''One iteration of active learning of alearner: train, evaluate and select the next batch. The performance and the
+    wall and CPU time of every phase of PHASES are appended to the lists of performance, the times with the keys
+    'wall-<phase>' and 'cpu-<phase>' (0 for the phases that the learner does not have)'''
+    timer = alearner.timer
+    timer.lap()
+    with timer.phase('train'):
+        alearner.train()
+    with timer.phase('evaluate'):
+        perf = alearner.evaluate(performanceMeasures)
+    with timer.phase('select'):
+        alearner.selectNext(batchSize, diversity)
+    wall, cpu = timer.lap()
+    for key in perf:
+        performance[key].append(perf[key])
+    for phase in PHASES:
+        performance.setdefault('wall-'+phase, []).append(wall.get(phase, 0.0))
+        performance.setdefault('cpu-'+phase, []).append(cpu.get(phase, 0.0))
@@ -0,0 +1,172 @@
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.utils import check_random_state
+
+
+MAX_INT = np.iinfo(np.int32).max
+
+
+class IncrementalRandomForestClassifier:
+    '''Random forest classifier that is updated instead of refitted from scratch when labelled datapoints are added.
+    As in sklearn, every tree is fitted on all datapoints with its bootstrap counts as sample weights. A datapoint that
+    is added later enters the bootstrap of every tree k ~ Poisson(1) times (online bagging, N. Oza, S. Russell 'Online
+    Bagging and Boosting'). The trees with k = 0 are kept as they are. In a tree with k > 0 the datapoint falls into a
+    leaf: if the leaf only holds datapoints of its class, regrowing the tree would keep it a leaf, and only its class
+    counts are updated in place. Otherwise the leaf would have to be split: its counts are updated in place too, so that
+    the tree predicts with the new datapoint at once, and the tree is regrown. With max_refits, at most max_refits trees
+    are regrown per update, the ones waiting for the longest first, and the others are regrown in the next updates.
+    The impurities of the inner nodes, and with them feature_importances_, are the ones of the last time the tree was grown.
+    The fitted forest exposes estimators_, classes_, oob_score_ and feature_importances_ like RandomForestClassifier.'''
+
+    def __init__(self, n_estimators=10, oob_score=False, n_jobs=1, random_state=None, max_features='sqrt', max_refits=None):
+        '''input: n_estimators -- the number of trees
+                  oob_score -- whether to compute the out of bag accuracy after every update
+                  n_jobs -- the number of threads used to grow the trees
+                  random_state -- seed of the bootstrap samples and of the trees, None for the global generator of numpy
+                  max_features -- the number of features considered at every split, as in RandomForestClassifier
+                  max_refits -- the maximal number of trees regrown per update, None for all the trees whose leaf has to be split'''
+
+        self.n_estimators = n_estimators
+        self.oob_score = oob_score
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.max_features = max_features
+        self.max_refits = max_refits
+
+
+    def fit(self, X, y):
+        '''fit all the trees on bootstrap samples of (X, y)'''
+        # with random_state None the forest draws from the global generator of numpy, like the sklearn forests
+        self._rng = np.random.RandomState(self.random_state) if self.random_state is not None else None
+        self._X = np.array(X, dtype=np.float32)
+        self._y = np.ravel(y).copy()
+        self.classes_ = np.unique(self._y)
+        self.n_classes_ = len(self.classes_)
+        n_samples = self._X.shape[0]
+        # bootstrap counts of every datapoint in every tree
+        self._counts = np.zeros((self.n_estimators, n_samples))
+        for t in range(self.n_estimators):
+            self._counts[t] = np.bincount(self._random().randint(0, n_samples, n_samples), minlength=n_samples)
+        self.estimators_ = [None]*self.n_estimators
+        # the number of the update since which a tree waits to be regrown, -1 for the trees that are up to date
+        self._staleSince = np.zeros(self.n_estimators, dtype=int)-1
+        self._nUpdates = 0
+        self._growTrees(np.arange(self.n_estimators))
+        return self
+
+
+    def partial_fit(self, X, y):
+        '''add the datapoints (X, y) to the training data, update the leaves they fall into and regrow the trees in which
+        such a leaf has to be split'''
+        y = np.ravel(y)
+        if not hasattr(self, 'estimators_') or np.any(~np.isin(y, self.classes_)):
+            # the forest can only be updated for the classes that it already knows
+            if hasattr(self, 'estimators_'):
+                X = np.concatenate((self._X, X))
+                y = np.concatenate((self._y, y))
+            return self.fit(X, y)
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        newCounts = self._random().poisson(1, (self.n_estimators, np.shape(X)[0]))
+        self._X = np.concatenate((self._X, X))
+        self._y = np.concatenate((self._y, y))
+        self._counts = np.concatenate((self._counts, newCounts), axis=1)
+        for t in np.flatnonzero(np.any(newCounts>0, axis=1)):
+            if not self._updateLeaves(t, X, y, newCounts[t]) and self._staleSince[t]<0:
+                self._staleSince[t] = self._nUpdates
+        self._nUpdates += 1
+
+        stale = np.flatnonzero(self._staleSince>=0)
+        # the trees waiting for the longest first, by their index for the same update
+        stale = stale[np.argsort(self._staleSince[stale], kind='stable')]
+        if self.max_refits is not None:
+            stale = stale[:self.max_refits]
+        self._growTrees(stale)
+        return self
+
+
+    def predict_proba(self, X):
+        '''average of the class probabilities predicted by the trees'''
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.zeros((X.shape[0], self.n_classes_))
+        for tree in self.estimators_:
+            proba += tree.predict_proba(X, check_input=False)
+        proba /= len(self.estimators_)
+        return proba
+
+
+    def predict(self, X):
+        '''the class with the highest average probability'''
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+    @property
+    def feature_importances_(self):
+        '''the impurity based feature importances averaged over the trees, as in RandomForestClassifier'''
+        all_importances = [tree.feature_importances_ for tree in self.estimators_ if tree.tree_.node_count > 1]
+        if not all_importances:
+            return np.zeros(self._X.shape[1], dtype=np.float64)
+        all_importances = np.mean(all_importances, axis=0, dtype=np.float64)
+        return all_importances / np.sum(all_importances)
+
+
+    # ---------------------------PRIVATE FUNCTIONS-------------------------
+    # ---------------------------------------------------------------------
+    def _random(self):
+
+        return self._rng if self._rng is not None else check_random_state(None)
+
+
+    def _updateLeaves(self, t, X, y, counts):
+        '''add the datapoints X with the weights counts to the class counts of their leaves of tree t
+        output: True if all these leaves only held datapoints of the class of their new datapoint'''
+
+        tree = self.estimators_[t].tree_
+        # the value of the nodes holds the class counts or, in the newer versions of sklearn, the class fractions
+        fractions = np.isclose(np.sum(tree.value[0]), 1) and not np.isclose(tree.weighted_n_node_samples[0], 1)
+        pure = True
+        leaves = self.estimators_[t].apply(X, check_input=False)
+        for leaf, label, count in zip(leaves, y, counts):
+            if count==0:
+                continue
+            weight = tree.weighted_n_node_samples[leaf]
+            classCounts = tree.value[leaf,0,:]*weight if fractions else tree.value[leaf,0,:].copy()
+            c = np.flatnonzero(self.classes_==label)[0]
+            pure = pure and np.sum(classCounts)==classCounts[c]
+            classCounts[c] += count
+            tree.value[leaf,0,:] = classCounts/(weight+count) if fractions else classCounts
+            tree.weighted_n_node_samples[leaf] = weight+count
+        return pure
+
+
+    def _growTrees(self, trees):
+
+        if len(trees)==0:
+            if self.oob_score:
+                self._setOobScore()
+            return
+        seeds = self._random().randint(MAX_INT, size=len(trees))
+        grown = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self._growTree)(self._counts[t], seed) for t, seed in zip(trees, seeds))
+        for t, tree in zip(trees, grown):
+            self.estimators_[t] = tree
+        self._staleSince[trees] = -1
+        if self.oob_score:
+            self._setOobScore()
+
+
+    def _growTree(self, counts, seed):
+
+        tree = DecisionTreeClassifier(max_features=self.max_features, random_state=seed)
+        return tree.fit(self._X, self._y, sample_weight=counts)
+
+
+    def _setOobScore(self):
+
+        predictions = np.zeros((self._X.shape[0], self.n_classes_))
+        for tree, counts in zip(self.estimators_, self._counts):
+            unsampled = counts==0
+            if np.any(unsampled):
+                predictions[unsampled] += tree.predict_proba(self._X[unsampled], check_input=False)
+        self.oob_score_ = np.mean(self._y == self.classes_.take(np.argmax(predictions, axis=1), axis=0))
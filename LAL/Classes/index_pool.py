@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class IndexPool:
+    '''Labelled and unlabelled indices of a dataset kept in one preallocated int32 array.
+    The first nKnown entries of order are the labelled indices, in the order in which they were labelled, and the rest are
+    the unlabelled ones. position maps every index to its place in order, so labelling a point swaps it with the first
+    unlabelled entry: O(1) and without any allocation. knownMask is a boolean mask of the labelled indices.'''
+
+    def __init__(self, indicesKnown, indicesUnknown, size=None):
+        '''input: indicesKnown -- indices of the labelled datapoints
+                  indicesUnknown -- indices of the unlabelled datapoints
+                  size -- number of datapoints in the dataset, by default the largest index + 1'''
+
+        indicesKnown = np.asarray(indicesKnown)
+        indicesUnknown = np.asarray(indicesUnknown)
+        if size is None:
+            size = int(max(np.max(indicesKnown, initial=-1), np.max(indicesUnknown, initial=-1)))+1
+        self.nKnown = np.size(indicesKnown)
+        self.order = np.empty(self.nKnown+np.size(indicesUnknown), dtype=np.int32)
+        self.order[:self.nKnown] = indicesKnown
+        self.order[self.nKnown:] = indicesUnknown
+        # -1 for the indices that are not in the pool
+        self.position = np.full(size, -1, dtype=np.int32)
+        self.position[self.order] = np.arange(np.size(self.order), dtype=np.int32)
+        self.knownMask = np.zeros(size, dtype=bool)
+        self.knownMask[indicesKnown] = True
+
+    @property
+    def known(self):
+        '''view of the labelled indices'''
+        return self.order[:self.nKnown]
+
+    @property
+    def unknown(self):
+        '''view of the unlabelled indices, their order changes when points are labelled'''
+        return self.order[self.nKnown:]
+
+    @property
+    def nUnknown(self):
+
+        return np.size(self.order)-self.nKnown
+
+    def add(self, index):
+        '''label the datapoint index'''
+        p = self.position[index]
+        if p<self.nKnown:
+            raise ValueError('index %d is not in the unlabelled pool' % index)
+        # swap it with the first unlabelled index and move the boundary behind it
+        q = self.nKnown
+        other = self.order[q]
+        self.order[p] = other
+        self.position[other] = p
+        self.order[q] = index
+        self.position[index] = q
+        self.nKnown += 1
+        self.knownMask[index] = True
+
+    def addUnknownAt(self, positions):
+        '''label the datapoints at the given positions of the view unknown
+        output: the labelled indices'''
+        indices = self.unknown[positions]
+        for index in indices:
+            self.add(index)
+        return indices
+
+    def addRandom(self, k=1):
+        '''label k datapoints sampled uniformly at random from the unlabelled ones
+        output: the labelled indices'''
+        indices = np.empty(min(k, self.nUnknown), dtype=np.int32)
+        for i in range(np.size(indices)):
+            indices[i] = self.order[self.nKnown+np.random.randint(self.nUnknown)]
+            self.add(indices[i])
+        return indices
+
+    def copy(self):
+
+        pool = IndexPool.__new__(IndexPool)
+        pool.nKnown = self.nKnown
+        pool.order = np.copy(self.order)
+        pool.position = np.copy(self.position)
+        pool.knownMask = np.copy(self.knownMask)
+        return pool
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+def forestTreePredictions(model, data, out=None):
+    '''Predictions of every tree of a random forest for the first class, computed in a single pass over the forest.
+    input: model -- a fitted RandomForestClassifier
+           data -- datapoints for which the trees should predict
+           out -- (optional) preallocated array of shape (number of trees, number of datapoints) to write to
+    output: out -- array where row t contains the probability of the first class given by tree t'''
+
+    # the trees work in float32, so the data is converted only once instead of once per tree
+    X = np.ascontiguousarray(data, dtype=np.float32)
+    if out is None:
+        out = np.empty((len(model.estimators_), X.shape[0]))
+    for t, tree in enumerate(model.estimators_):
+        out[t] = tree.predict_proba(X, check_input=False)[:,0]
+    return out
+
+
+def getLALfeatures(model, unknown_data, known_labels, n_labelled, n_dim, nFeatures=8, dtype=np.float32, out=None):
+    '''Compute the features that the LAL regressor uses to predict the expected error reduction of every unlabelled datapoint.
+    Predictions of the individual trees are obtained once and reused for the mean, the standard deviation and the variance of the forest.
+    input: model -- a fitted RandomForestClassifier with oob_score=True
+           unknown_data -- unlabelled datapoints for which the features are computed
+           known_labels -- labels of the labelled datapoints
+           n_labelled -- number of labelled datapoints
+           n_dim -- dimensionality of the data
+           nFeatures -- 8 to include the number of labelled datapoints as the last feature, 7 otherwise
+           dtype -- dtype of the feature matrix, float32 is enough for tree based regressors that cast their input to float32
+           out -- (optional) preallocated array of shape (number of unlabelled datapoints, nFeatures) to write to
+    output: out -- LAL features with one row per unlabelled datapoint, in the following order:
+            1: prediction probability
+            2: prediction variance
+            3: proportion of positive class
+            4: oob score
+            5: coeficiant of variance of feature importance
+            6: variance of forest
+            7: average depth of trees
+            8: number of datapoints in training'''
+
+    # predictions of the trees
+    temp = forestTreePredictions(model, unknown_data)
+    if out is None:
+        out = np.empty((temp.shape[1], nFeatures), dtype=dtype)
+    # - average and standard deviation of the predicted scores
+    out[:,0] = np.mean(temp, axis=0)
+    f_2 = np.std(temp, axis=0)
+    out[:,1] = f_2
+    # - proportion of positive points
+    out[:,2] = np.sum(known_labels>0)/n_labelled
+    # the score estimated on out of bag estimate
+    out[:,3] = model.oob_score_
+    # - coeficient of variance of feature importance
+    out[:,4] = np.std(model.feature_importances_/n_dim)
+    # - estimate variance of forest by looking at avergae of variance of some predictions
+    out[:,5] = np.mean(f_2, axis=0)
+    # - compute the average depth of the trees in the forest
+    out[:,6] = np.mean(np.array([tree.tree_.max_depth for tree in model.estimators_]))
+    if nFeatures>7:
+        # - number of already labelled datapoints
+        out[:,7] = n_labelled
+
+    return out
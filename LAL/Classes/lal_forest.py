@@ -0,0 +1,302 @@
+import os
+
+import numpy as np
+from sklearn.tree._tree import Tree
+
+
+# the arrays of a FlatForest in the folder written by saveForest
+ARRAYS = ['feature', 'threshold', 'children', 'value', 'roots']
+
+
+class FlatForest:
+    '''A forest of regression trees with the nodes of all the trees in flat arrays, as produced by flattenForest.
+    feature, threshold, left, right and value describe the nodes (left==-1 for a leaf), roots the first node of every tree.
+    predict walks all the trees at once and sums their predictions in the order of the trees, like a single-threaded
+    RandomForestRegressor, so the predictions are the same as the ones of the sklearn forest bit for bit
+    (a forest with n_jobs>1 sums the trees in the order in which its threads finish and can differ in the last bits).
+    A forest loaded by loadForest keeps its arrays memory-mapped and pickles as the name of its folder, like SharedDataset.'''
+
+    def __init__(self, feature, threshold, left, right, value, roots):
+
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.folder = None
+        self._children = None
+        self._nFeatures = None
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        if self.folder is not None:
+            for name in ARRAYS+['left', 'right', '_children']:
+                state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        if self.folder is not None:
+            self._attach()
+
+    @property
+    def nTrees(self):
+
+        return np.size(self.roots)
+
+    @property
+    def nNodes(self):
+
+        return np.size(self.feature)
+
+    def predict(self, X, blockSize=2**22):
+        '''input: X -- datapoints, cast to float32 as sklearn does
+                  blockSize -- the number of (tree, datapoint) pairs walked at once, bounds the memory
+        output: the average prediction of the trees'''
+        X = np.asarray(X, dtype=np.float32)
+        n = np.shape(X)[0]
+        out = np.zeros(n)
+        if n==0:
+            return out
+        treesPerBlock = max(1, blockSize//n)
+        for start in range(0, self.nTrees, treesPerBlock):
+            roots = self.roots[start:start+treesPerBlock]
+            nodes = np.repeat(roots, n)
+            rows = np.tile(np.arange(n), np.size(roots))
+            self._walk(X, rows, nodes)
+            values = np.reshape(self.value[nodes], (np.size(roots), n))
+            for t in range(np.size(roots)):
+                out += values[t]
+        out /= self.nTrees
+        return out
+
+    def specialize(self, constants):
+        '''Partially evaluate the forest for features with a known value: every split on one of them always takes the same
+        branch, so it is replaced by that branch. The smaller forest gives the same predictions as the full one for all the
+        datapoints with these values.
+        input: constants -- a dictionary {feature: value}
+        output: FlatForest with splits on the other features only'''
+        if self._nFeatures is None:
+            self._nFeatures = int(np.max(self.feature))+1
+        nFeatures = max(self._nFeatures, max(constants)+1)
+        # the slot nFeatures is used for the leaves (feature -2)
+        isConstant = np.zeros(nFeatures+1, dtype=bool)
+        values = np.zeros(nFeatures+1, dtype=np.float32)
+        for f in constants:
+            isConstant[f] = True
+            values[f] = constants[f]
+
+        def resolve(nodes):
+            '''follow the splits on the constant features down to the first node that splits on another feature or a leaf'''
+            nodes = np.copy(nodes)
+            active = np.arange(np.size(nodes))
+            while np.size(active)>0:
+                f = self.feature[nodes[active]]
+                f[f<0] = nFeatures
+                active = active[isConstant[f]]
+                if np.size(active)==0:
+                    break
+                node = nodes[active]
+                goLeft = values[self.feature[node]]<=self.threshold[node]
+                nodes[active] = np.where(goLeft, self.left[node], self.right[node])
+            return nodes
+
+        # copy the nodes that are still reachable, walking all the trees level by level
+        levels = []
+        frontier = resolve(self.roots)
+        tree = np.arange(self.nTrees)
+        parent = np.full(self.nTrees, -1)
+        isRight = np.zeros(self.nTrees, dtype=bool)
+        nNew = 0
+        while np.size(frontier)>0:
+            ids = nNew+np.arange(np.size(frontier))
+            nNew += np.size(frontier)
+            levels.append((frontier, tree, parent, isRight))
+            internal = self.left[frontier]>=0
+            nInternal = np.count_nonzero(internal)
+            tree = np.tile(tree[internal], 2)
+            parent = np.tile(ids[internal], 2)
+            isRight = np.repeat([False, True], nInternal)
+            frontier = np.concatenate((resolve(self.left[frontier[internal]]), resolve(self.right[frontier[internal]])))
+        nodes, tree, parent, isRight = [np.concatenate(arrays) for arrays in zip(*levels)]
+
+        # number the nodes tree by tree like flattenForest does, every tree starting with its root
+        order = np.argsort(tree, kind='stable')
+        newId = np.empty(nNew, dtype=self.left.dtype)
+        newId[order] = np.arange(nNew)
+        left = np.full(nNew, -1, dtype=self.left.dtype)
+        right = np.full(nNew, -1, dtype=self.right.dtype)
+        child = np.flatnonzero(parent>=0)
+        left[newId[parent[child[~isRight[child]]]]] = newId[child[~isRight[child]]]
+        right[newId[parent[child[isRight[child]]]]] = newId[child[isRight[child]]]
+        nodes = nodes[order]
+        return FlatForest(self.feature[nodes], self.threshold[nodes], left, right, self.value[nodes], newId[:self.nTrees])
+
+    def compile(self):
+        '''the trees as sklearn trees, whose compiled traversal is faster than the one of predict; meant for small forests,
+        like the ones returned by specialize, because the nodes are copied
+        output: CompiledForest'''
+        nFeatures = max(np.max(self.feature)+1, 1)
+        ends = np.concatenate((self.roots[1:], [self.nNodes]))
+        nodeDtype = Tree(nFeatures, np.array([1], dtype=np.intp), 1).__getstate__()['nodes'].dtype
+        trees = []
+        for root, end in zip(self.roots, ends):
+            nodes = np.zeros(end-root, dtype=nodeDtype)
+            isLeaf = self.left[root:end]<0
+            nodes['left_child'] = np.where(isLeaf, -1, self.left[root:end]-root)
+            nodes['right_child'] = np.where(isLeaf, -1, self.right[root:end]-root)
+            nodes['feature'] = np.where(isLeaf, -2, self.feature[root:end])
+            nodes['threshold'] = np.where(isLeaf, -2, self.threshold[root:end])
+            tree = Tree(nFeatures, np.array([1], dtype=np.intp), 1)
+            tree.__setstate__({'max_depth': 0, 'node_count': end-root, 'nodes': nodes,
+                               'values': np.reshape(self.value[root:end], (-1, 1, 1)).astype(np.float64)})
+            trees.append(tree)
+        return CompiledForest(trees)
+
+    def lookupGrid(self, features=(0, 1), maxCells=10**6):
+        '''The prediction of a forest that splits on two features only is constant on the cells of the grid of all its
+        thresholds, so it can be tabulated once and looked up for any number of datapoints.
+        input: features -- the two features the forest splits on, for example after specialize
+               maxCells -- the grid is not built if it would have more cells
+        output: LookupGrid or None'''
+        internal = self.left>=0
+        if np.any(~np.isin(self.feature[internal], features)):
+            raise ValueError('the forest splits on other features than %s' % (features,))
+        thresholds = [np.unique(self.threshold[internal & (self.feature==f)]) for f in features]
+        shape = (np.size(thresholds[0])+1, np.size(thresholds[1])+1)
+        if shape[0]*shape[1]>maxCells:
+            return None
+        representatives = [_cellRepresentatives(t) for t in thresholds]
+        X = np.zeros((shape[0]*shape[1], max(features)+1), dtype=np.float32)
+        X[:,features[0]] = np.repeat(representatives[0], shape[1])
+        X[:,features[1]] = np.tile(representatives[1], shape[0])
+        return LookupGrid(features, thresholds, np.reshape(self.predict(X), shape))
+
+    def _attach(self):
+
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(self.folder, name+'.npy'), mmap_mode='r'))
+        self.left = self.children[:,0]
+        self.right = self.children[:,1]
+        # the interleaved children used by _walk are a view of the mapped file
+        self._children = np.ravel(self.children)
+
+    def _walk(self, X, rows, nodes):
+
+        if self._children is None:
+            # the two children of a node side by side, the child of node on the side goRight is _children[2*node+goRight]
+            self._children = np.ravel(np.stack((self.left, self.right), axis=1))
+        Xflat = np.ravel(X)
+        offsets = rows*np.shape(X)[1]
+        # only the pairs that are not in a leaf yet are moved down
+        active = np.flatnonzero(self.left[nodes]>=0)
+        while np.size(active)>0:
+            node = nodes[active]
+            goRight = Xflat[offsets[active]+self.feature[node]]>self.threshold[node]
+            node = self._children[2*node+goRight]
+            nodes[active] = node
+            active = active[self.left[node]>=0]
+
+
+class CompiledForest:
+    '''A forest as a list of sklearn trees, their predictions are summed in the order of the trees like in FlatForest'''
+
+    def __init__(self, trees):
+
+        self.trees = trees
+
+    def predict(self, X):
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        out = np.zeros(np.shape(X)[0])
+        for tree in self.trees:
+            out += tree.predict(X)[:,0]
+        out /= len(self.trees)
+        return out
+
+
+class LookupGrid:
+    '''The predictions of a forest over two features tabulated on the cells between its thresholds'''
+
+    def __init__(self, features, thresholds, values):
+
+        self.features = features
+        self.thresholds = thresholds
+        self.values = values
+
+    @property
+    def nCells(self):
+
+        return np.size(self.values)
+
+    def predict(self, X):
+
+        X = np.asarray(X, dtype=np.float32)
+        # a split sends x<=threshold to the left, the cell of x is the first threshold that is not smaller than x
+        i = np.searchsorted(self.thresholds[0], X[:,self.features[0]], side='left')
+        j = np.searchsorted(self.thresholds[1], X[:,self.features[1]], side='left')
+        return self.values[i, j]
+
+
+def flattenForest(model):
+    '''Copy the trees of a fitted RandomForestRegressor into a FlatForest'''
+
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    feature = np.concatenate([tree.feature for tree in trees]).astype(np.int32)
+    threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+    value = np.concatenate([tree.value[:,0,0] for tree in trees]).astype(np.float64)
+    left = np.concatenate([np.where(tree.children_left>=0, tree.children_left+offset, -1) for tree, offset in zip(trees, offsets)])
+    right = np.concatenate([np.where(tree.children_right>=0, tree.children_right+offset, -1) for tree, offset in zip(trees, offsets)])
+    return FlatForest(feature, threshold, left.astype(np.int64), right.astype(np.int64), value, offsets.astype(np.int64))
+
+
+def saveForest(forest, folder):
+    '''Write a FlatForest (or a fitted RandomForestRegressor, which is flattened first) to folder as .npy files'''
+
+    if not isinstance(forest, FlatForest):
+        forest = flattenForest(forest)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    arrays = {'feature': forest.feature, 'threshold': forest.threshold, 'value': forest.value, 'roots': forest.roots,
+              'children': np.stack((forest.left, forest.right), axis=1)}
+    for name in ARRAYS:
+        filename = os.path.join(folder, name+'.npy')
+        # write to a temporary file first so that a process never maps a half-written array
+        np.save(filename+'.tmp.npy', np.ascontiguousarray(arrays[name]))
+        os.replace(filename+'.tmp.npy', filename)
+
+
+def loadForest(folder):
+    '''Map the FlatForest written by saveForest: nothing is read before it is used, and all the processes that load the
+    same folder share the pages of the files'''
+
+    for name in ARRAYS:
+        if not os.path.exists(os.path.join(folder, name+'.npy')):
+            raise FileNotFoundError('%s is not an exported LAL regressor, export it first with export_lal_models.py' % folder)
+    forest = FlatForest.__new__(FlatForest)
+    forest.folder = folder
+    forest._nFeatures = None
+    forest._attach()
+    return forest
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+def _cellRepresentatives(thresholds):
+    '''a float32 value inside every cell (t[i-1], t[i]] of the sorted thresholds and one above the last threshold'''
+    if np.size(thresholds)==0:
+        return np.zeros(1, dtype=np.float32)
+    # the largest float32 that is not bigger than the upper bound of the cell
+    upper = thresholds.astype(np.float32)
+    tooBig = upper>thresholds
+    upper[tooBig] = np.nextafter(upper[tooBig], np.float32(-np.inf))
+    # and the smallest float32 above the last threshold
+    last = np.float32(thresholds[-1])
+    if last<=thresholds[-1]:
+        last = np.nextafter(last, np.float32(np.inf))
+    return np.concatenate((upper, [last])).astype(np.float32)
@@ -1,6 +1,8 @@
 from sklearn.ensemble import RandomForestRegressor
+from joblib import Parallel, delayed
 import numpy as np
 import math
+import copy
 
 class LALmodel:
     ''' Class for the regressor that predicts the expected error reduction caused by adding datapoints'''
@@ -10,12 +12,17 @@ class LALmodel:
         self.all_data_for_lal = all_data_for_lal
         self.all_labels_for_lal = all_labels_for_lal
         
-    def crossValidateLALmodel(self, possible_estimators, possible_depth, possible_features):
+    def crossValidateLALmodel(self, possible_estimators, possible_depth, possible_features, halving=True):
         ''' Cross-validate the regressor model.
         input: possible_estimators -- list of possible number of estimators (trees) in Random Forest regression
         possible_depth -- list of possible maximum depth of the tree in RF regressor
-        possible_features -- list of possible maximum number of features in a split of tree in RF regressor'''
+        possible_features -- list of possible maximum number of features in a split of tree in RF regressor
+        halving -- if True, the parameters are searched by successive halving with warm-started forests
+                   (halvingSearchLALmodel), otherwise all the combinations are fitted'''
             
+        if halving:
+            return self.halvingSearchLALmodel(possible_estimators, possible_depth, possible_features)
+        
         best_score = -math.inf
 
         self.best_est = 0
@@ -40,9 +47,63 @@ class LALmodel:
         return best_score
     
     
+    def halvingSearchLALmodel(self, possible_estimators, possible_depth, possible_features, eta=3, nJobs=8, small_number=0):
+        ''' Search the parameters of the regressor by successive halving: all the (depth, features) configurations are fitted
+        with the smallest number of estimators, only the best 1/eta of them by oob score are grown to the next number of
+        estimators with warm_start, which keeps the trees fitted before, and so on. The configurations of a round are fitted
+        in parallel. The best configuration is reported as by the exhaustive crossValidateLALmodel, among all the tested ones.
+        input: possible_estimators, possible_depth, possible_features -- as in crossValidateLALmodel
+        eta -- the fraction of the configurations that is kept after every number of estimators is 1/eta
+        nJobs -- number of threads shared by the forests of a round
+        small_number -- a configuration is better than the best one only if its score is higher by more than small_number
+        output: best_score'''
+        
+        rungs = sorted(set(possible_estimators))
+        configs = [(depth, feat) for depth in possible_depth for feat in possible_features]
+        # every forest has its own seed, so the result does not depend on the order in which the threads run
+        seeds = np.random.randint(np.iinfo(np.int32).max, size=len(configs))
+        models = dict((config, RandomForestRegressor(max_depth=config[0], max_features=config[1], oob_score=True, warm_start=True, random_state=seed)) for config, seed in zip(configs, seeds))
+        labels = np.ravel(self.all_labels_for_lal)
+        
+        best_score = -math.inf
+
+        self.best_est = 0
+        self.best_depth = 0
+        self.best_feat = 0
+    
+        print('start successive halving..')
+        for i, est in enumerate(rungs):
+            scores = Parallel(n_jobs=min(nJobs, len(configs)), prefer='threads')(
+                delayed(_growForest)(models[config], est, max(1, nJobs//len(configs)), self.all_data_for_lal, labels) for config in configs)
+            for (depth, feat), score in zip(configs, scores):
+                if score>best_score+small_number:
+                    self.best_est = est
+                    self.best_depth = depth
+                    self.best_feat = feat
+                    # the forest will get more trees in the next rounds, the best one is kept as it is now
+                    self.model = copy.copy(models[(depth, feat)])
+                    self.model.estimators_ = list(self.model.estimators_)
+                    best_score = score
+                print('parameters tested = ', est, ', ', depth, ', ', feat, ', with the score = ', score)
+            if i<len(rungs)-1:
+                best = np.argsort(-np.array(scores), kind='stable')[:max(1, int(math.ceil(len(configs)/eta)))]
+                configs = [configs[j] for j in sorted(best)]
+        print('best parameters = ', self.best_est, ', ', self.best_depth, ', ', self.best_feat, ', with the best score = ', best_score)
+        return best_score
+    
+    
     def builtModel(self, est, depth, feat):
         ''' Fits the regressor with the parameters identifier as an input '''
             
         self.model = RandomForestRegressor(n_estimators = est, max_depth=depth, max_features=feat, oob_score=True, n_jobs=8)
         self.model.fit(self.all_data_for_lal, np.ravel(self.all_labels_for_lal))
         print('oob score = ', self.model.oob_score_)
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+def _growForest(model, est, n_jobs, data, labels):
+    '''grow the warm-started forest model to est trees and return its oob score'''
+    model.set_params(n_estimators=est, n_jobs=n_jobs)
+    model.fit(data, labels)
+    return model.oob_score_
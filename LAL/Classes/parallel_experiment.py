@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from .experiment import runIteration
+
+
+class LearnerSpec:
+    '''Recipe of an active learner that can be sent to other processes and built there:
+    learnerClass(dataset, nEstimators, name, *args, **kwargs)'''
+
+    def __init__(self, learnerClass, name, *args, **kwargs):
+
+        self.learnerClass = learnerClass
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def build(self, dataset, nEstimators):
+
+        return self.learnerClass(dataset, nEstimators, self.name, *self.args, **self.kwargs)
+
+
+class ParallelExperiment:
+    '''Active learning experiment whose replicas and learners run as independent tasks, possibly in a pool of processes.
+    Every task reseeds the global random generator from (seed, experiment, replica, learner), so the results do not
+    depend on the order in which the tasks are executed and a parallel run is identical to a serial run with the same seed.'''
+
+    def __init__(self, nIterations, nEstimators, performanceMeasures, datasetClass, alearners, nStart, comment='', batchSize=1, diversity=0, datasetArgs=(), seed=0):
+        '''input: datasetClass, datasetArgs -- the dataset is built in every process as datasetClass(*datasetArgs)
+                  alearners -- a list of LearnerSpec
+                  nStart -- number of labelled datapoints at the beginning of every replica
+                  seed -- the seed from which the random streams of the dataset and of all the tasks are derived
+                  the other parameters are the ones of Experiment'''
+
+        self.nIterations = nIterations
+        self.nEstimators = nEstimators
+        self.performanceMeasures = performanceMeasures
+        self.datasetClass = datasetClass
+        self.datasetArgs = datasetArgs
+        self.alearners = alearners
+        self.nStart = nStart
+        self.comment = comment
+        self.batchSize = batchSize
+        self.diversity = diversity
+        self.seed = seed
+        self._dataset = None
+
+    @property
+    def dataset(self):
+        '''the dataset as it is built in the workers, used by Results for its name'''
+        if self._dataset is None:
+            randomState = np.random.get_state()
+            self._dataset = _buildDataset(self)
+            np.random.set_state(randomState)
+        return self._dataset
+
+    def __getstate__(self):
+
+        # workers build their own copy of the dataset
+        state = self.__dict__.copy()
+        state['_dataset'] = None
+        return state
+
+    def run(self, nExperiments, nCores=None, nJobs=1):
+        '''Run nExperiments replicas for all alearners and return a list with the performances of every replica,
+        in the format of Experiment.run'''
+        return runExperiments([self], nExperiments, nCores, nJobs)[0]
+
+
+def runExperiments(experiments, nExperiments, nCores=None, nJobs=1):
+    '''Run the replicas of several experiments, every (experiment, replica, learner) being a task of a pool of processes.
+    input: experiments -- a list of ParallelExperiment
+           nExperiments -- the number of replicas of every experiment
+           nCores -- the number of cores to use, all of them by default
+           nJobs -- the number of threads of the forests of every task; the pool has nCores//nJobs workers so that
+                    the forests do not oversubscribe the machine. With nJobs>1 the forests sum the predictions of
+                    their trees in the order in which the threads finish, so the results are reproducible only up to rounding
+    output: performances -- performances[e][r] is the dictionary of performances of replica r of experiments[e]'''
+
+    if nCores is None:
+        nCores = os.cpu_count()
+    nWorkers = max(1, nCores//nJobs)
+    tasks = [(e, r, l) for e in range(len(experiments)) for r in range(nExperiments) for l in range(len(experiments[e].alearners))]
+
+    if nWorkers==1:
+        randomState = np.random.get_state()
+        _initWorker(experiments, nJobs)
+        results = [_runTask(task) for task in tasks]
+        np.random.set_state(randomState)
+    else:
+        pool = multiprocessing.Pool(min(nWorkers, len(tasks)), _initWorker, (experiments, nJobs))
+        try:
+            results = pool.map(_runTask, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    performances = [[dict() for r in range(nExperiments)] for experiment in experiments]
+    for (e, r, l), performance in zip(tasks, results):
+        performances[e][r][experiments[e].alearners[l].name] = performance
+    return performances
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+# state of a worker process, set once by _initWorker instead of being sent with every task
+_experiments = None
+_nJobs = None
+_datasets = dict()
+
+
+def _initWorker(experiments, nJobs):
+
+    global _experiments, _nJobs, _datasets
+    _experiments = experiments
+    _nJobs = nJobs
+    _datasets = dict()
+
+
+def _taskSeed(seed, *key):
+    '''an independent random stream for every key'''
+    return np.random.SeedSequence([seed]+list(key)).generate_state(1)[0]
+
+
+def _buildDataset(experiment):
+
+    # datasets that split the data at random in their constructor must be the same in all processes
+    np.random.seed(_taskSeed(experiment.seed))
+    return experiment.datasetClass(*experiment.datasetArgs)
+
+
+def _runTask(task):
+
+    e, r, l = task
+    experiment = _experiments[e]
+    if e not in _datasets:
+        _datasets[e] = _buildDataset(experiment)
+    dataset = _datasets[e]
+
+    # the starting state of a replica is shared by all the learners
+    np.random.seed(_taskSeed(experiment.seed, r))
+    dataset.setStartState(experiment.nStart)
+    np.random.seed(_taskSeed(experiment.seed, r, l))
+    alearner = experiment.alearners[l].build(dataset, experiment.nEstimators)
+    alearner.model.n_jobs = _nJobs
+
+    performance = dict()
+    for performanceMeasure in experiment.performanceMeasures:
+        performance[performanceMeasure] = []
+    for it in range(experiment.nIterations):
+        runIteration(alearner, experiment.performanceMeasures, performance, experiment.batchSize, experiment.diversity)
+    return performance
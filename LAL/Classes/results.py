@@ -1,9 +1,18 @@
+import json
+import os
+
 import numpy as np
 import pickle as pkl
 import matplotlib.pyplot as plt
 import matplotlib.cm as cmx
 import matplotlib.colors as colors
 
+from .timing import PHASES
+
+
+# the name of the description of the experiment in the files of saveResults
+META = '__meta__'
+
 
 class Results:
     '''The class that that saves, load and plots the results.'''
@@ -14,19 +23,26 @@ class Results:
         self.existingMetrics = ['accuracy', 'auc', 'IoU', 'dice', 'f-measure']
         
         if experiment is not None:
-            experiment.dtstname = experiment.dataset.__class__.__name__
+            # a SharedDataset has the name of the dataset that was published
+            experiment.dtstname = getattr(experiment.dataset, 'name', experiment.dataset.__class__.__name__)
+            self.dtstname = experiment.dtstname
             self.nIterations = experiment.nIterations
             self.nEstimators = experiment.nEstimators
             self.performanceMeasures = experiment.performanceMeasures
-            self.dataset = experiment.dataset
             self.alearners = []
             for alearner in experiment.alearners:
                 self.alearners.append(alearner.name)
             self.comment = experiment.comment
+            self.batchSize = experiment.batchSize
             self.nExperiments = nExperiments
             
+            # performances[alearner][performanceMeasure] is an (experiment x iteration) view of the first nAdded rows of a
+            # buffer that is allocated for nExperiments rows and doubled when more experiments are added
+            self.nAdded = 0
+            self._buffers = dict()
             self.performances = dict()
             for alearner in self.alearners:
+                self._buffers[alearner] = dict()
                 self.performances[alearner] = dict()
                 for performanceMeasure in self.performanceMeasures:
                     self.performances[alearner][performanceMeasure] = np.array([[]])
@@ -36,22 +52,87 @@ class Results:
         '''This function adds performance measures of new experiments'''
         for alearner in performance:
             for performanceMeasure in performance[alearner]:
-                if np.size(self.performances[alearner][performanceMeasure])==0:
-                    self.performances[alearner][performanceMeasure] = np.array([performance[alearner][performanceMeasure]])
-                else:
-                    self.performances[alearner][performanceMeasure] = np.concatenate((self.performances[alearner][performanceMeasure], np.array([performance[alearner][performanceMeasure]])), axis=0)
+                row = np.asarray(performance[alearner][performanceMeasure])
+                buffer = self._buffers[alearner].get(performanceMeasure)
+                if buffer is None:
+                    buffer = np.empty((max(self.nExperiments or 1, self.nAdded+1), np.size(row)), dtype=row.dtype)
+                elif self.nAdded==np.shape(buffer)[0]:
+                    buffer = np.concatenate((buffer, np.empty_like(buffer)), axis=0)
+                buffer[self.nAdded] = row
+                self._buffers[alearner][performanceMeasure] = buffer
+        self.nAdded += 1
+        for alearner in self._buffers:
+            for performanceMeasure in self._buffers[alearner]:
+                self.performances[alearner][performanceMeasure] = self._buffers[alearner][performanceMeasure][:self.nAdded]
                     
                     
     def saveResults(self, filename):
-        '''Save the current results to a file filename in ./exp folder'''
-        state = self.__dict__.copy()
-        pkl.dump(state, open( './exp/'+filename+'.p', "wb" ) )    
+        '''Save the current results to a file filename.npz in ./exp folder: one array per learner and performance measure and
+        the description of the experiment, without the dataset'''
+        meta = {'dtstname': self.dtstname, 'nIterations': self.nIterations, 'nEstimators': self.nEstimators,
+                'performanceMeasures': list(self.performanceMeasures), 'alearners': list(self.alearners),
+                'comment': self.comment, 'batchSize': self.batchSize, 'nExperiments': self.nExperiments}
+        arrays = {META: np.array(json.dumps(meta))}
+        for alearner in self.alearners:
+            for performanceMeasure in self.performances[alearner]:
+                arrays[_key(alearner, performanceMeasure)] = self.performances[alearner][performanceMeasure]
+        np.savez('./exp/'+filename+'.npz', **arrays)
+        
+    
+    def readResult(self, filename, alearners = None, metrics = None):
+        '''Read the results from filename from ./exp folder
+        input: alearners, metrics -- the names of the learners and the performance measures to read, all of them by default;
+                                     the arrays of the others are not read from the file'''
+        if not os.path.exists('./exp/'+filename+'.npz'):
+            # results saved before as a pickle of the whole object
+            state = pkl.load( open ('./exp/'+filename+'.p', "rb") )
+            self.__dict__.update(state)
+        else:
+            self._readArrays('./exp/'+filename+'.npz', alearners, metrics)
+        self.nAdded = min([np.shape(self.performances[alearner][performanceMeasure])[0] for alearner in self.performances for performanceMeasure in self.performances[alearner] if np.size(self.performances[alearner][performanceMeasure])>0], default=0)
+        self._buffers = dict((alearner, dict((key, value) for key, value in self.performances[alearner].items() if np.size(value)>0)) for alearner in self.performances)
+        
+        
+    def _readArrays(self, filename, alearners, metrics):
+        
+        with np.load(filename) as data:
+            self.__dict__.update(json.loads(str(data[META])))
+            if alearners is not None:
+                self.alearners = [alearner for alearner in self.alearners if alearner in alearners]
+            if metrics is not None:
+                self.performanceMeasures = [performanceMeasure for performanceMeasure in self.performanceMeasures if performanceMeasure in metrics]
+            self.performances = dict()
+            for alearner in self.alearners:
+                self.performances[alearner] = dict()
+                # the times of the phases are always read, they are small
+                for performanceMeasure in self.performanceMeasures+[clock+'-'+phase for phase in PHASES for clock in ['wall', 'cpu']]:
+                    if _key(alearner, performanceMeasure) in data.files:
+                        self.performances[alearner][performanceMeasure] = data[_key(alearner, performanceMeasure)]
         
     
-    def readResult(self, filename):
-        '''Read the results from filename from ./exp folder'''
-        state = pkl.load( open ('./exp/'+filename+'.p', "rb") )
-        self.__dict__.update(state)
+    def timingTable(self, metric = None):
+        '''A table of the mean wall and CPU time per iteration of every phase of every learner, with the total time and the
+        final value of metric (the first performance measure by default) of every learner, to compare the cost of the
+        strategies with their performance. CPU time includes all the threads of the forests.
+        output: the table as a string'''
+        if metric is None:
+            metric = self.performanceMeasures[0]
+        lines = ['%-20s %-12s %12s %12s %8s' % ('learner', 'phase', 'wall, s/it', 'cpu, s/it', 'wall, %')]
+        for alearner in self.alearners:
+            performance = self.performances[alearner]
+            if 'wall-'+PHASES[0] not in performance:
+                lines.append('%-20s no timings' % alearner)
+                continue
+            wall = dict((phase, np.mean(performance['wall-'+phase])) for phase in PHASES)
+            cpu = dict((phase, np.mean(performance['cpu-'+phase])) for phase in PHASES)
+            totalWall = sum(wall.values())
+            for phase in PHASES:
+                # the phases that the learner does not have are not shown
+                if np.any(performance['wall-'+phase]>0):
+                    lines.append('%-20s %-12s %12.4f %12.4f %8.1f' % (alearner, phase, wall[phase], cpu[phase], 100*wall[phase]/totalWall))
+            final = np.mean(performance[metric][:,-1]) if metric in performance else np.nan
+            lines.append('%-20s %-12s %12.4f %12.4f %8s  final %s %.4f' % (alearner, 'total', totalWall, sum(cpu.values()), '', metric, final))
+        return '\n'.join(lines)
         
     
     def plotResults(self, metrics = None):
@@ -67,7 +148,7 @@ class Results:
                 i = 0
                 for alearner in self.alearners:
                     avResult = np.mean(self.performances[alearner][performanceMeasure], axis=0)
-                    plt.plot(avResult, color=col(i), label=alearner)
+                    plt.plot(self._nLabelled(avResult), avResult, color=col(i), label=alearner)
                     i = i+1
                 plt.xlabel('# labelled points')
                 plt.ylabel(performanceMeasure)
@@ -81,18 +162,17 @@ class Results:
                     plt.figure()
                     i = 0
                     for alearner in self.alearners:
-                        if performanceMeasure=='accuracy' or performanceMeasure=='auc':
+                        if performanceMeasure in self.performances[alearner]:
+                            # measured by evaluate in every iteration
                             avResult = np.mean(self.performances[alearner][performanceMeasure], axis=0)
-                        if performanceMeasure=='auc':
-                            avResult =np.mean(self.performances[alearner]['auc'],axis=(0))
-                        if performanceMeasure=='IoU':
+                        elif performanceMeasure=='IoU':
                             avResult =np.mean((self.performances[alearner]['TP']/(self.performances[alearner]['TP']+self.performances[alearner]['FP']+self.performances[alearner]['FN']+small_eps)),axis=(0))
                         elif performanceMeasure=='dice':
                             avResult = np.mean((2*self.performances[alearner]['TP']/(2*self.performances[alearner]['TP']+self.performances[alearner]['FP']+self.performances[alearner]['FN']+small_eps)),axis=(0))
                         elif performanceMeasure=='f-measure':
                             avResult = np.mean((2*self.performances[alearner]['TP']/(2*self.performances[alearner]['TP']+self.performances[alearner]['FP']+self.performances[alearner]['FN']+small_eps)),axis=(0))
                             
-                        plt.plot(avResult, color=col(i), label=alearner)
+                        plt.plot(self._nLabelled(avResult), avResult, color=col(i), label=alearner)
                         i = i+1
                     plt.xlabel('# labelled points')
                     plt.ylabel(performanceMeasure)
@@ -105,6 +185,71 @@ class Results:
     
         return plt_list
         
+    def elapsedTime(self, alearner):
+        '''Compute time spent by alearner before every evaluation: the cumulative wall time of all its phases but evaluate,
+        up to the training of the evaluated model
+        output: an (experiment x iteration) array, None if the results have no timings'''
+        performance = self.performances[alearner]
+        if 'wall-'+PHASES[0] not in performance:
+            return None
+        cost = sum(performance['wall-'+phase] for phase in PHASES if phase!='evaluate')
+        # the model of iteration i is evaluated after its training, before its selection
+        return np.cumsum(cost, axis=1)-(cost-performance['wall-train'])
+        
+    def plotResultsVsTime(self, metrics = None, budget = None):
+        '''Plot the performance in the metrics against the compute time, averaged over the experiments, all the saved
+        metrics by default
+        input: budget -- if given, the curves are shown up to budget seconds'''
+        col = self._get_cmap(len(self.alearners)+1)
+        plt_list = []
+        for performanceMeasure in (self.performanceMeasures if metrics is None else metrics):
+            plt.figure()
+            i = 0
+            for alearner in self.alearners:
+                elapsed = self.elapsedTime(alearner)
+                if elapsed is not None and performanceMeasure in self.performances[alearner]:
+                    plt.plot(np.mean(elapsed, axis=0), np.mean(self.performances[alearner][performanceMeasure], axis=0), color=col(i), label=alearner)
+                i = i+1
+            if budget is not None:
+                plt.xlim(0, budget)
+            plt.xlabel('compute time, s')
+            plt.ylabel(performanceMeasure)
+            lgd = plt.legend(loc='lower right')
+            plt_list.append(plt)
+        return plt_list
+        
+    def scorePerSecond(self, metric = None, budget = None):
+        '''Rank the learners by the area under their curve of metric against compute time up to budget, divided by budget:
+        the mean performance of the latest trained model over the budget, counted as 0 before the first model
+        input: metric -- one of the recorded performance measures, the first one by default
+               budget -- in seconds, by default the shortest total compute time among the learners, so that every
+                         learner is ranked on the time it actually ran
+        output: a list of (learner, score), the best first'''
+        if metric is None:
+            metric = self.performanceMeasures[0]
+        if metric not in self.performanceMeasures:
+            raise ValueError('%s was not recorded, the recorded performance measures are %s' % (metric, list(self.performanceMeasures)))
+        curves = dict()
+        for alearner in self.alearners:
+            elapsed = self.elapsedTime(alearner)
+            if elapsed is not None and metric in self.performances[alearner]:
+                curves[alearner] = (np.mean(elapsed, axis=0), np.mean(self.performances[alearner][metric], axis=0))
+        if budget is None:
+            budget = min([elapsed[-1] for elapsed, quality in curves.values()], default=0)
+        scores = []
+        for alearner in curves:
+            elapsed, quality = curves[alearner]
+            # the model of every evaluation is used until the next one is trained
+            starts = np.minimum(elapsed, budget)
+            ends = np.minimum(np.append(elapsed[1:], budget), budget)
+            scores.append((alearner, np.sum(quality*(ends-starts))/budget if budget>0 else np.nan))
+        return sorted(scores, key=lambda score: -score[1])
+        
+    def _nLabelled(self, avResult):
+        '''Number of points labelled by active learning before every evaluation in avResult'''
+        # results saved before batch mode was introduced label one point per iteration
+        return np.arange(np.size(avResult))*getattr(self, 'batchSize', 1)
+        
     def _get_cmap(self, N):
         '''Returns a function that maps each index in 0, 1, ... N-1 to a distinct 
         RGB color.'''
@@ -112,4 +257,11 @@ class Results:
         scalar_map = cmx.ScalarMappable(norm=color_norm, cmap='hsv') 
         def map_index_to_rgb_color(index):
             return scalar_map.to_rgba(index)
-        return map_index_to_rgb_color
\ No newline at end of file
+        return map_index_to_rgb_color
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+def _key(alearner, performanceMeasure):
+    '''the name of the array of alearner and performanceMeasure in the files of saveResults'''
+    return alearner+'/'+performanceMeasure
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from .dataset import Dataset
+
+
+# the arrays of a dataset that are published
+ARRAYS = ['trainData', 'trainLabels', 'testData', 'testLabels']
+# the file with the class name of the published dataset
+NAME = 'name.txt'
+
+
+class SharedDataset(Dataset):
+    '''Dataset whose arrays are read-only memory-mapped .npy files written by publishDataset.
+    All processes that open the same folder share the pages of the files instead of holding private copies, and pickling
+    the dataset (to send it to a worker or to save it with the results) only stores the folder, so the memory use stays
+    flat as the number of workers grows. A folder in /dev/shm keeps the arrays in shared memory instead of on disk.
+    name is the class name of the published dataset, used by Results instead of the name of this class.'''
+
+    def __init__(self, folder):
+
+        Dataset.__init__(self)
+        self.folder = folder
+        self.name = type(self).__name__
+        if os.path.exists(os.path.join(folder, NAME)):
+            with open(os.path.join(folder, NAME)) as f:
+                self.name = f.read()
+        self._attach()
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        for name in ARRAYS:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._attach()
+
+    def _attach(self):
+
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(self.folder, name+'.npy'), mmap_mode='r'))
+
+
+def publishDataset(dataset, folder, dtype=np.float32):
+    '''Write the scaled train and test data of dataset to folder once, so that any number of processes can attach to them.
+    input: dataset -- an object of class Dataset or any inheriting classes
+           folder -- the folder for the .npy files
+           dtype -- dtype of trainData and testData, float32 by default because the forests cast their input to float32
+                    anyway, and then they use the mapped arrays without making a converted copy in every process
+    output: SharedDataset attached to the published arrays'''
+
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    for name in ARRAYS:
+        array = getattr(dataset, name)
+        if name in ['trainData', 'testData'] and dtype is not None:
+            array = array.astype(dtype)
+        filename = os.path.join(folder, name+'.npy')
+        # write to a temporary file first so that a process never attaches to a half-written array
+        np.save(filename+'.tmp.npy', np.ascontiguousarray(array))
+        os.replace(filename+'.tmp.npy', filename)
+    with open(os.path.join(folder, NAME+'.tmp'), 'w') as f:
+        f.write(type(dataset).__name__)
+    os.replace(os.path.join(folder, NAME+'.tmp'), os.path.join(folder, NAME))
+    return SharedDataset(folder)
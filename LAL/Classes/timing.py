@@ -0,0 +1,63 @@
+import time
+
+
+# the phases of an iteration of active learning that are timed, in the order of the timing tables
+# select is the bookkeeping of selectNext, without the phases nested in it
+PHASES = ['train', 'evaluate', 'select', 'candidates', 'features', 'regressor']
+
+
+class PhaseTimer:
+    '''Wall and CPU time spent in named phases. Phases can be nested: the time of a phase excludes the time of the phases
+    started inside it, so the times of all the phases add up to the total time. CPU time is the time of the whole process,
+    so it is bigger than the wall time when the forests use several threads.'''
+
+    def __init__(self):
+
+        self.wall = dict()
+        self.cpu = dict()
+        # [name, wall start, cpu start, wall of the nested phases, cpu of the nested phases] of the running phases
+        self._stack = []
+
+    def phase(self, name):
+        '''a context manager that times the phase name: with timer.phase('train'): ...'''
+        return _Phase(self, name)
+
+    def start(self, name):
+
+        self._stack.append([name, time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def stop(self):
+
+        name, wallStart, cpuStart, nestedWall, nestedCpu = self._stack.pop()
+        wall = time.perf_counter()-wallStart
+        cpu = time.process_time()-cpuStart
+        self.wall[name] = self.wall.get(name, 0.0)+wall-nestedWall
+        self.cpu[name] = self.cpu.get(name, 0.0)+cpu-nestedCpu
+        if self._stack:
+            self._stack[-1][3] += wall
+            self._stack[-1][4] += cpu
+
+    def lap(self):
+        '''the times of the phases since the previous lap
+        output: wall, cpu -- dictionaries with the phases as keys'''
+        wall, cpu = self.wall, self.cpu
+        self.wall, self.cpu = dict(), dict()
+        return wall, cpu
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+class _Phase:
+
+    def __init__(self, timer, name):
+
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+
+        self.timer.start(self.name)
+
+    def __exit__(self, *exception):
+
+        self.timer.stop()
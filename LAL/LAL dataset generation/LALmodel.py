@@ -1,6 +1,12 @@
 from sklearn.ensemble import RandomForestRegressor
 import numpy as np
 import math
+import os
+import sys
+
+# the search engine is shared with the regressors of the experiments in ../Classes
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Classes.lal_model import LALmodel as _SearchModel
 
 class LALmodel:
 
@@ -9,12 +15,24 @@ class LALmodel:
         self.all_data_for_lal = all_data_for_lal
         self.all_labels_for_lal = all_labels_for_lal
         
-    def crossValidateLALmodel(self):
+    def crossValidateLALmodel(self, halving=True):
+        '''input: halving -- if True, the parameters are searched by successive halving with warm-started forests
+                             (halvingSearchLALmodel of Classes/lal_model.py), otherwise all the combinations are fitted'''
             
         possible_estimators = [500, 1000, 5000]
         possible_depth = [5, 10, 20]
         possible_features =[3, 5, 7]
         small_number = 0.0001
+        
+        if halving:
+            # the last column, the number of labelled points, is not a feature of these regressors
+            search = _SearchModel(self.all_data_for_lal[:,:-1], self.all_labels_for_lal)
+            best_score = search.halvingSearchLALmodel(possible_estimators, possible_depth, possible_features, small_number=small_number)
+            self.best_est = search.best_est
+            self.best_depth = search.best_depth
+            self.best_feat = search.best_feat
+            self.model = search.model
+            return best_score
     
         best_score = -math.inf
 
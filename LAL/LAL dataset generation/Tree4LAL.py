@@ -6,33 +6,40 @@ import scipy.io as sio
 from sklearn import preprocessing
 from sklearn.ensemble import RandomForestClassifier
 from sklearn import metrics
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
+import os
+import sys
 
 from Dataset4LAL import DatasetSimulated
+# the LAL features are shared with the active learners in ../Classes
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Classes.lal_features import getLALfeatures
 
 class Tree4LAL:
 
-    def __init__(self, criterion, dataset, lalModels, method):
+    def __init__(self, criterion, dataset, lalModels, method, headless=False, gainMode='exact'):
+        '''input: headless -- if True, getLALdatapoints does not print the quality and does not plot the gains, so that
+                              the generation can run unattended
+                  gainMode -- how getLALdatapoints measures the change of the quality by adding a point:
+                              'exact' -- a new forest is trained with the point and predicts the whole test set
+                              'approx' -- the point is added to the leaves of the trees of the current forest whose bootstrap
+                                          would contain it, only the test points in these leaves are predicted again'''
                 
         self.dataset = dataset
         self.criterion = criterion
         self.lalModels = lalModels
         # let's decide that the number of estimators for any classifier is 50
         self.n_estimators = 50
+        # threads of the forests, set to 1 when the trees are generated in a pool of processes
+        self.n_jobs = 8
+        self.headless = headless
+        self.gainMode = gainMode
         self.method = method
         
     def generateTree(self, depth):
             
-        # first get 1 positive and 1 negative point
-        cl1 = np.nonzero(self.dataset.trainLabels==1)[0]
-        indeces1 = np.random.permutation(cl1)
-        self.indecesKnown = np.array([indeces1[0]])
-        
-        cl2 = np.nonzero(self.dataset.trainLabels==0)[0]
-        indeces2 = np.random.permutation(cl2)
-        self.indecesKnown = np.concatenate(([self.indecesKnown, np.array([indeces2[0]])]))
-        self.indecesUnknown = np.concatenate(([indeces1[1:], indeces2[1:]]))
-        self.indecesUnknown = np.random.permutation(self.indecesUnknown)
+        self.startTrajectory()
         
         if depth>2:
             if self.criterion=='random':
@@ -54,19 +61,47 @@ class Tree4LAL:
                 iteration2simulate = np.arange(2,depth,1)
                 
                 for it in iteration2simulate:
+                    self.growOne()
                     
-                    known_data = self.dataset.trainData[self.indecesKnown,:]
-                    known_labels = self.dataset.trainLabels[self.indecesKnown]
-                    unknown_data = self.dataset.trainData[self.indecesUnknown,:]
-                    unknown_labels = self.dataset.trainLabels[self.indecesUnknown]
-                    
-                    # train a model every time we grow the tree
-                    self.model = RandomForestClassifier(self.n_estimators, oob_score=True, n_jobs=8)
-                    known_labels = np.ravel(known_labels)
-                    self.model = self.model.fit(known_data, known_labels)
-                    
-                    # it should modify the list of known and unknown indeces
-                    self._selectNext(self.model, self.lalModels[it-2], it, known_data, known_labels, unknown_data, unknown_labels)            
+    def startTrajectory(self):
+        
+        '''start a tree with 1 positive and 1 negative labelled point, it is then grown one point at a time by growOne'''
+        # first get 1 positive and 1 negative point
+        cl1 = np.nonzero(self.dataset.trainLabels==1)[0]
+        indeces1 = np.random.permutation(cl1)
+        self.indecesKnown = np.array([indeces1[0]])
+        
+        cl2 = np.nonzero(self.dataset.trainLabels==0)[0]
+        indeces2 = np.random.permutation(cl2)
+        self.indecesKnown = np.concatenate(([self.indecesKnown, np.array([indeces2[0]])]))
+        self.indecesUnknown = np.concatenate(([indeces1[1:], indeces2[1:]]))
+        self.indecesUnknown = np.random.permutation(self.indecesUnknown)
+        # the model trained on the current labelled points, if any
+        self.model = None
+        self.modelSize = 0
+        
+    def growOne(self):
+        
+        '''add one point to the labelled points of the tree: the next random point, or for the iterative tree the point
+        chosen by the LAL model of the current depth from the model trained on the current labelled points, which is
+        reused if getLALdatapoints has trained it already. The model is freed afterwards, it is not the model of the new
+        labelled points'''
+        if self.criterion=='random':
+            self.indecesKnown = np.concatenate(([self.indecesKnown, self.indecesUnknown[0:1]]))
+            self.indecesUnknown = self.indecesUnknown[1:]
+            
+        elif self.criterion=='iterative':
+            it = np.size(self.indecesKnown)
+            known_data = self.dataset.trainData[self.indecesKnown,:]
+            known_labels = np.ravel(self.dataset.trainLabels[self.indecesKnown])
+            unknown_data = self.dataset.trainData[self.indecesUnknown,:]
+            unknown_labels = self.dataset.trainLabels[self.indecesUnknown]
+            
+            # it should modify the list of known and unknown indeces
+            self._selectNext(self._knownModel(known_data, known_labels), self.lalModels[it-2], it, known_data, known_labels, unknown_data, unknown_labels)
+        # the forests of the trees grown together would otherwise stay in memory until their next getLALdatapoints
+        self.model = None
+        self.modelSize = 0
 
     def getLALdatapoints(self, n_points_per_experiment):
         
@@ -77,9 +112,8 @@ class Tree4LAL:
         unknown_labels = self.dataset.trainLabels[self.indecesUnknown]
        
         # train a model every time we grow the tree
-        self.model = RandomForestClassifier(self.n_estimators, oob_score=True, n_jobs=8)
         known_labels = np.ravel(known_labels)
-        self.model = self.model.fit(known_data, known_labels)
+        self.model = self._knownModel(known_data, known_labels)
         
         nFeatures = 8
         # get my features
@@ -87,43 +121,27 @@ class Tree4LAL:
         feature_vector = self._getFeaturevector4LAL(self.model, unknown_data[0:n_points_per_experiment,:], known_labels, nFeatures)
         
         # predict on test data to evaluate the classifier quality
-
+        quality_0 = self._testQuality(self.model)
+            
+        # sample n_points_per_experiment samples that we will add to the training dataset and check the change in quality
+        if self.gainMode=='approx':
+            qualities = self._approxQualities(self.model, unknown_data[0:n_points_per_experiment,:], unknown_labels[0:n_points_per_experiment])
+        else:
+            # the lookahead models are independent, they are trained in threads that share the data and get their own seeds
+            # so that the gains do not depend on the order in which the threads run
+            seeds = np.random.randint(np.iinfo(np.int32).max, size=n_points_per_experiment)
+            qualities = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+                delayed(self._lookaheadQuality)(known_data, known_labels, unknown_data[i,:], unknown_labels[i], seed) for i, seed in enumerate(seeds))
         if self.method=='error':
-            test_prediction = self.model.predict(self.dataset.testData)  
-            quality_0_error = metrics.zero_one_loss(self.dataset.testLabels, test_prediction)
+            # how much the error has decreased
+            gains_quality = quality_0-np.array(qualities)
         elif self.method=='auc':
-            test_prediction = self.model.predict_proba(self.dataset.testData)  
-            test_prediction = test_prediction[:,1]
-            quality_0_auc = metrics.roc_auc_score(self.dataset.testLabels, test_prediction)
-            
-        # sample n_points_per_experiment samples that we will add to the training dataset and check the change in error
-        gains_quality = np.zeros((n_points_per_experiment))
-        for i in range(n_points_per_experiment):
-            # try to add it to the labelled data
-            new_known_data = np.concatenate((known_data,[unknown_data[i,:]]))
-            new_known_labels = np.concatenate((known_labels,unknown_labels[i]))
-
-            # train updated model - model_i
-            m_i = RandomForestClassifier(self.n_estimators, n_jobs=8)
-            new_known_labels = np.ravel(new_known_labels)
-            m_i = m_i.fit(new_known_data, new_known_labels)
-                    
-            if self.method=='error':
-                # predict on test data
-                test_prediction = m_i.predict(self.dataset.testData)   
-                quality_i_error = metrics.zero_one_loss(self.dataset.testLabels, test_prediction)
-                # how much the quality has changed
-                gains_quality[i]=(quality_0_error-quality_i_error)
-
-            elif self.method=='auc':
-                test_prediction = m_i.predict_proba(self.dataset.testData)  
-                test_prediction = test_prediction[:,1]
-                quality_i_auc = metrics.roc_auc_score(self.dataset.testLabels, test_prediction)
-                gains_quality[i]=(quality_i_auc-quality_0_auc)
-        
-        print(quality_0_error)
-        plt.plot(feature_vector[:,0], gains_quality, '.')
-        plt.show(block=True)
+            gains_quality = np.array(qualities)-quality_0
+        
+        if not self.headless:
+            print(quality_0)
+            plt.plot(feature_vector[:,0], gains_quality, '.')
+            plt.show(block=True)
                   
         return feature_vector, gains_quality    
             
@@ -144,10 +162,72 @@ class Tree4LAL:
         self.indecesUnknown = np.delete(self.indecesUnknown, selectedIndex1toN) 
 
         
-    def _getFeaturevector4LAL(self, model, unknown_data, known_labels, nFeatures):
+    def _knownModel(self, known_data, known_labels):
+        
+        # the labelled points only grow, so the model trained on as many points as there are now is trained on them
+        if self.model is None or self.modelSize!=np.size(self.indecesKnown):
+            self.model = RandomForestClassifier(self.n_estimators, oob_score=True, n_jobs=self.n_jobs)
+            self.model = self.model.fit(known_data, known_labels)
+            self.modelSize = np.size(self.indecesKnown)
+        return self.model
+        
+        
+    def _testQuality(self, model):
+        
+        return self._qualityFromProba(model.classes_, model.predict_proba(self.dataset.testData))
+        
+        
+    def _qualityFromProba(self, classes, test_proba):
+        
+        # zero-one loss for 'error', area under the ROC curve for 'auc'
+        if self.method=='error':
+            test_prediction = classes.take(np.argmax(test_proba, axis=1))
+            return metrics.zero_one_loss(self.dataset.testLabels, test_prediction)
+        elif self.method=='auc':
+            return metrics.roc_auc_score(self.dataset.testLabels, test_proba[:,1])
+        
+        
+    def _approxQualities(self, model, new_data, new_labels):
+        
+        # every tree would draw a new point Poisson(1) times in its bootstrap; in the trees that draw it, it is added to the
+        # class counts of the leaf it falls into, without changing the splits, and the test points of that leaf change
+        test_proba = model.predict_proba(self.dataset.testData)
+        test_leaves = model.apply(self.dataset.testData)
+        # the test points of every leaf of tree t are order[lo:hi,t], found by a binary search in sorted_leaves[:,t]
+        order = np.argsort(test_leaves, axis=0, kind='stable')
+        sorted_leaves = np.take_along_axis(test_leaves, order, axis=0)
+        new_leaves = model.apply(new_data)
+        nTrees = len(model.estimators_)
+        qualities = []
+        for i in range(np.shape(new_data)[0]):
+            label = np.flatnonzero(model.classes_==np.ravel(new_labels[i])[0])[0]
+            multiplicity = np.random.poisson(1, size=nTrees)
+            proba_i = test_proba.copy()
+            for t in np.flatnonzero(multiplicity):
+                tree = model.estimators_[t].tree_
+                leaf = new_leaves[i,t]
+                # weighted class counts of the leaf, whether value holds counts or fractions
+                counts = tree.value[leaf,0,:]/np.sum(tree.value[leaf,0,:])*tree.weighted_n_node_samples[leaf]
+                new_counts = counts.copy()
+                new_counts[label] += multiplicity[t]
+                lo, hi = np.searchsorted(sorted_leaves[:,t], [leaf, leaf+1])
+                proba_i[order[lo:hi,t]] += (new_counts/np.sum(new_counts)-counts/np.sum(counts))/nTrees
+            qualities.append(self._qualityFromProba(model.classes_, proba_i))
+        return qualities
         
-        # - predicted mean (but only for n_points_per_experiment datapoints)
-        prediction_unknown = model.predict_proba(unknown_data)
+        
+    def _lookaheadQuality(self, known_data, known_labels, new_data, new_label, seed):
+        
+        # try to add the datapoint to the labelled data and train updated model - model_i
+        new_known_data = np.concatenate((known_data,[new_data]))
+        new_known_labels = np.ravel(np.concatenate((known_labels,new_label)))
+        # every lookahead model is single-threaded, the lookaheads run in parallel
+        m_i = RandomForestClassifier(self.n_estimators, n_jobs=1, random_state=seed)
+        m_i = m_i.fit(new_known_data, new_known_labels)
+        return self._testQuality(m_i)
+        
+        
+    def _getFeaturevector4LAL(self, model, unknown_data, known_labels, nFeatures):
         
         # features are in the following order:
         # 1: prediction probability
@@ -158,38 +238,9 @@ class Tree4LAL:
         # 6: variance of forest
         # 7: average depth of trees
         # 8: number of datapoints in training
-        
-        f_1 = prediction_unknown[:,0]
-
-        # - predicted standard deviation 
-        # need to call each tree of a forest separately to get a prediction because it is not possible to get them all immediately
-        f_2 = np.std(np.array([tree.predict_proba(unknown_data)[:,0] for tree in model.estimators_]), axis=0)
-
-        # - proportion of positive points
-        # check np.size(self.indecesKnown)
-        f_3 = (sum(known_labels>0)/np.size(self.indecesKnown))*np.ones_like(f_1)
-
-        # the score estimated on out of bag estimate
-        f_4 = model.oob_score_*np.ones_like(f_1)
-
-        # - coeficient of variance of feature importance
-        # check if this is the number of features!
-        f_5 = np.std(model.feature_importances_/self.dataset.trainData.shape[1])*np.ones_like(f_1)
-
-        # - estimate variance of forest by looking at avergae of variance of some predictions
-        f_6 = np.mean(np.std(np.array([tree.predict_proba(unknown_data)[:,0] for tree in model.estimators_]), axis=0))*np.ones_like(f_1)
-        
-        # - compute the average depth of the trees in the forest
-        f_7 = np.mean(np.array([tree.tree_.max_depth for tree in model.estimators_]))*np.ones_like(f_1)    
-                
-        LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7]), axis=0)
-        
-        if nFeatures>7:
-            # the same as f_3, check np.size(self.indecesKnown)
-            f_8 = np.size(self.indecesKnown)*np.ones_like(f_1)
-            LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
-        
-        LALfeatures = np.transpose(LALfeatures)        
+        # the mean prediction of the forest is the mean over its trees, so one pass over the trees gives f_1, f_2 and f_6;
+        # the features are kept in float64 because they are saved as the training data of the LAL regressors
+        LALfeatures = getLALfeatures(model, unknown_data, known_labels, np.size(self.indecesKnown), self.dataset.trainData.shape[1], nFeatures, dtype=np.float64)
         
         return LALfeatures
 
@@ -0,0 +1,45 @@
+import argparse
+import time
+
+import numpy as np
+from scipy import stats
+
+from Dataset4LAL import DatasetSimulated
+from Tree4LAL import Tree4LAL
+
+# Compares the approximate gains of Tree4LAL (gainMode='approx') with the exact ones on the same trees and candidates:
+# the error of the approximation and the time per LAL datapoint, for every depth.
+#
+# python benchmark_gains.py [--datasets N] [--method error|auc]
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Error and speed of the approximate gains of Tree4LAL')
+    parser.add_argument('--datasets', type=int, default=20, help='number of simulated datasets per depth')
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 5, 10, 20, 40], help='numbers of labelled points')
+    parser.add_argument('--points', type=int, default=10, help='candidates per dataset')
+    parser.add_argument('--method', default='error', choices=['error', 'auc'])
+    args = parser.parse_args()
+
+    np.random.seed(805)
+    print('%6s %10s %10s %10s %10s %12s %12s' % ('depth', 'mae', 'rmse', 'pearson', 'spearman', 'exact, s/pt', 'approx, s/pt'))
+    for depth in args.depths:
+        exact, approx = [], []
+        exactTime, approxTime = 0.0, 0.0
+        for i_dataset in range(args.datasets):
+            dataset = DatasetSimulated(400, 2)
+            tree = Tree4LAL('random', dataset, [], args.method, headless=True)
+            tree.generateTree(depth)
+            # the forest of the labelled points is trained once, outside of the timings, and shared by both modes
+            tree.getLALdatapoints(1)
+            start = time.perf_counter()
+            exact.append(tree.getLALdatapoints(args.points)[1])
+            exactTime += time.perf_counter()-start
+            tree.gainMode = 'approx'
+            start = time.perf_counter()
+            approx.append(tree.getLALdatapoints(args.points)[1])
+            approxTime += time.perf_counter()-start
+        exact, approx = np.concatenate(exact), np.concatenate(approx)
+        nPoints = np.size(exact)
+        print('%6d %10.5f %10.5f %10.3f %10.3f %12.5f %12.5f' % (depth, np.mean(np.absolute(approx-exact)), np.sqrt(np.mean((approx-exact)**2)),
+              stats.pearsonr(exact, approx)[0], stats.spearmanr(exact, approx)[0], exactTime/nPoints, approxTime/nPoints))
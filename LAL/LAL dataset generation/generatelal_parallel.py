@@ -0,0 +1,236 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle as pkl
+
+import numpy as np
+
+from Dataset4LAL import DatasetSimulated
+from Tree4LAL import Tree4LAL
+from LALmodel import LALmodel
+
+# The generation of generatelal.py and generatelal_iterative.py with every (n_labelled, shard of datasets) work unit
+# run in a pool of processes. Every unit has its own random stream derived from the seed and writes its datapoints to a
+# shard file, so the data does not depend on the number of cores and a restarted run skips the shards that exist.
+# With the iterative tree growing the levels of n_labelled are run one after the other, since every level needs the LAL
+# models trained on all the previous ones; these models are saved with the shards too.
+# The experiment the shards are generated with is written to manifest.json in the folder, and a run with another
+# experiment is refused instead of mixing its shards and models with the existing ones.
+#
+# python generatelal_parallel.py random|iterative [--cores N]
+
+experiment = dict()
+# number of datasets for which we will generate data
+experiment['n_datasets'] = 500
+# number of datasets of one work unit
+experiment['n_datasets_per_shard'] = 25
+# how many datapoints will be labelled at the beginning, including 1 positive and 1 negative
+experiment['n_labelleds'] = np.arange(2,50,1)
+# how many times we will sample data with the same parameters
+experiment['n_points_per_experiment'] = 10
+# size of the training sets of the simulated datasets
+experiment['n_datapoints'] = 400
+# dimensionality of the data
+experiment['n_dim'] = 2
+# measure of quality change
+experiment['method'] = 'error'
+experiment['seed'] = 805
+
+# number of LAL features of every datapoint
+N_FEATURES = 8
+
+# the parameters of experiment in the manifest of a folder of shards, a run only continues the shards of the same ones
+MANIFEST_KEYS = ['treegrowing', 'n_datasets', 'n_datasets_per_shard', 'n_points_per_experiment', 'n_datapoints', 'n_dim',
+                 'method', 'seed']
+
+
+def generateShard(experiment, n_labelled, shard, lalModels, folder):
+    '''Generate the LAL datapoints of the datasets of one shard of level n_labelled and save them to folder, unless the
+    shard exists already.
+    output: the path of the shard'''
+
+    path = _shardPath(folder, n_labelled, shard)
+    if os.path.exists(path):
+        return path
+    np.random.seed(_unitSeed(experiment['seed'], n_labelled, shard))
+    n_points = experiment['n_points_per_experiment']
+    datasets = _shardDatasets(experiment, shard)
+    data_for_lal = np.empty((len(datasets)*n_points, N_FEATURES))
+    labels_for_lal = np.empty(len(datasets)*n_points)
+    nRows = 0
+    for i_dataset in datasets:
+        dataset = DatasetSimulated(experiment['n_datapoints'], experiment['n_dim'])
+        tree = Tree4LAL(experiment['treegrowing'], dataset, lalModels, experiment['method'], headless=True)
+        # the pool has a process per core, more threads per forest would oversubscribe the machine
+        tree.n_jobs = 1
+        tree.generateTree(n_labelled)
+        data, labels = tree.getLALdatapoints(n_points)
+        data_for_lal[nRows:nRows+np.shape(data)[0]] = data
+        labels_for_lal[nRows:nRows+np.size(labels)] = labels
+        nRows += np.size(labels)
+    _save(path, data_for_lal[:nRows], labels_for_lal[:nRows])
+    return path
+
+
+def mergeShards(experiment, folder, n_labelleds=None):
+    '''The datapoints of all the shards of the levels n_labelleds (all the levels by default) in the order of the serial
+    generation, copied once into preallocated arrays
+    output: all_data_for_lal, all_labels_for_lal'''
+
+    _checkManifest(experiment, folder)
+    if n_labelleds is None:
+        n_labelleds = experiment['n_labelleds']
+    paths = [_shardPath(folder, n_labelled, shard) for n_labelled in n_labelleds for shard in range(_nShards(experiment))]
+    sizes = []
+    for path in paths:
+        with np.load(path) as shard:
+            sizes.append(np.size(shard['arr_1']))
+    all_data_for_lal = np.empty((sum(sizes), N_FEATURES))
+    all_labels_for_lal = np.empty(sum(sizes))
+    start = 0
+    for path, size in zip(paths, sizes):
+        with np.load(path) as shard:
+            all_data_for_lal[start:start+size] = shard['arr_0']
+            all_labels_for_lal[start:start+size] = shard['arr_1']
+        start += size
+    return all_data_for_lal, all_labels_for_lal
+
+
+def generate(experiment, folder, nCores=None):
+    '''Generate all the shards of experiment in folder, in a pool of nCores processes (all the cores by default)'''
+
+    os.makedirs(folder, exist_ok=True)
+    _checkManifest(experiment, folder)
+    if nCores is None:
+        nCores = os.cpu_count()
+    if experiment['treegrowing']=='random':
+        _runUnits(experiment, folder, [(n_labelled, shard) for n_labelled in experiment['n_labelleds'] for shard in range(_nShards(experiment))], [], nCores)
+        return
+
+    lalModels = []
+    for n_labelled in experiment['n_labelleds']:
+        print('n_lablled = ', n_labelled)
+        _runUnits(experiment, folder, [(n_labelled, shard) for shard in range(_nShards(experiment))], lalModels, nCores)
+        # for every size of the tree train a lal model and attach it to the list of models for all sizes of trees
+        modelPath = os.path.join(folder, 'model-n%d.p' % n_labelled)
+        if not os.path.exists(modelPath):
+            np.random.seed(_unitSeed(experiment['seed'], n_labelled))
+            lalModel = LALmodel(*mergeShards(experiment, folder, [n_labelled]))
+            lalModel.crossValidateLALmodel()
+            with open(modelPath+'.tmp', 'wb') as f:
+                pkl.dump(lalModel.model, f)
+            os.replace(modelPath+'.tmp', modelPath)
+        with open(modelPath, 'rb') as f:
+            lalModels.append(pkl.load(f))
+
+
+# ---------------------------PRIVATE FUNCTIONS-------------------------
+# ---------------------------------------------------------------------
+# state of a worker process, set once by _initWorker instead of being sent with every unit
+_experiment = None
+_folder = None
+_lalModels = None
+
+
+def _initWorker(experiment, folder, lalModels):
+
+    global _experiment, _folder, _lalModels
+    _experiment = experiment
+    _folder = folder
+    _lalModels = lalModels
+
+
+def _runUnit(unit):
+
+    n_labelled, shard = unit
+    path = generateShard(_experiment, n_labelled, shard, _lalModels, _folder)
+    print('*', end='', flush=True)
+    return path
+
+
+def _runUnits(experiment, folder, units, lalModels, nCores):
+
+    units = [unit for unit in units if not os.path.exists(_shardPath(folder, *unit))]
+    if len(units)==0:
+        return
+    if nCores==1:
+        _initWorker(experiment, folder, lalModels)
+        for unit in units:
+            _runUnit(unit)
+    else:
+        pool = multiprocessing.Pool(min(nCores, len(units)), _initWorker, (experiment, folder, lalModels))
+        try:
+            pool.map(_runUnit, units, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    print()
+
+
+def _unitSeed(seed, *key):
+    '''an independent random stream for every key'''
+    return np.random.SeedSequence([seed]+[int(k) for k in key]).generate_state(1)[0]
+
+
+def _checkManifest(experiment, folder):
+    '''write the manifest of experiment to folder, or check that it is the one of the shards in folder'''
+
+    manifest = dict((key, experiment[key]) for key in MANIFEST_KEYS)
+    if experiment['treegrowing']=='iterative':
+        # every level is generated with the LAL models of the levels before it, in the random trees they are independent
+        manifest['n_labelleds'] = [int(n_labelled) for n_labelled in experiment['n_labelleds']]
+    path = os.path.join(folder, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        different = [key for key in sorted(set(saved) | set(manifest)) if saved.get(key)!=manifest.get(key)]
+        if different:
+            raise ValueError('the shards in %s were generated with another %s, use another folder or remove it'
+                             % (folder, ', '.join(different)))
+        return
+    with open(path+'.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path+'.tmp', path)
+
+
+def _nShards(experiment):
+
+    return -(-experiment['n_datasets']//experiment['n_datasets_per_shard'])
+
+
+def _shardDatasets(experiment, shard):
+
+    start = shard*experiment['n_datasets_per_shard']
+    return range(start, min(start+experiment['n_datasets_per_shard'], experiment['n_datasets']))
+
+
+def _shardPath(folder, n_labelled, shard):
+
+    return os.path.join(folder, 'n%d-shard%d.npz' % (n_labelled, shard))
+
+
+def _save(path, data_for_lal, labels_for_lal):
+
+    # a shard is complete once it has its final name, an interrupted write leaves only the temporary file
+    with open(path+'.tmp', 'wb') as f:
+        np.savez(f, data_for_lal, labels_for_lal)
+    os.replace(path+'.tmp', path)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Generate the training data of the LAL regressors in parallel')
+    parser.add_argument('treegrowing', choices=['random', 'iterative'], help='random adds random samples, iterative adds the samples chosen by the LAL models of the previous levels')
+    parser.add_argument('--cores', type=int, default=None, help='number of processes, all the cores by default')
+    args = parser.parse_args()
+    experiment['treegrowing'] = args.treegrowing
+
+    name = 'LAL-%stree-simulated2Gauss2dim' % args.treegrowing
+    folder = './lal datasets/shards/'+name
+    generate(experiment, folder, args.cores)
+
+    all_sizes_data_for_lal, all_sizes_labels_for_lal = mergeShards(experiment, folder)
+    print(all_sizes_data_for_lal.shape)
+    print(all_sizes_labels_for_lal.shape)
+    np.savez('./lal datasets/'+name, all_sizes_data_for_lal, all_sizes_labels_for_lal)
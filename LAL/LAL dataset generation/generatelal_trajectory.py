@@ -0,0 +1,103 @@
+import argparse
+import os
+
+import numpy as np
+
+from Dataset4LAL import DatasetSimulated
+from Tree4LAL import Tree4LAL
+from LALmodel import LALmodel
+
+# The data of generatelal.py and generatelal_iterative.py from one growing tree per simulated dataset: every tree emits
+# the LAL datapoints of every depth in n_labelleds on its way, instead of being grown again from 2 labelled points for
+# every depth, and the model trained for the datapoints of a depth is the one that chooses the next point of an
+# iterative tree. The work is linear in the maximal depth instead of quadratic.
+# The datapoints of the different depths of one tree come from the same dataset and the same labelled points, so they
+# are correlated, while generatelal.py draws a new dataset for every depth. So that they are not mixed with the data of
+# generatelal.py, they are saved in 'lal datasets/trajectory' with generation='trajectory' and the depth and the dataset
+# of every datapoint (n_labelled, dataset), e.g. to keep the datapoints of a dataset in the same fold.
+#
+# python generatelal_trajectory.py random|iterative
+
+experiment = dict()
+# number of datasets for which we will generate data
+experiment['n_datasets'] = 500
+# how many datapoints will be labelled at the beginning, including 1 positive and 1 negative
+experiment['n_labelleds'] = np.arange(2,50,1)
+# how many times we will sample data with the same parameters
+experiment['n_points_per_experiment'] = 10
+# dimensionality of the data
+experiment['n_dim'] = 2
+# measure of quality change
+experiment['method'] = 'error'
+
+# number of LAL features of every datapoint
+N_FEATURES = 8
+
+
+def generateTrajectories(experiment, nDatapoints=400):
+    '''Grow a tree for each of n_datasets simulated datasets through all the depths of n_labelleds (consecutive, starting
+    at 2) and collect the LAL datapoints of every depth. The trees are grown depth by depth together, since the iterative
+    trees of a depth need the LAL model trained on the datapoints of all the trees at that depth.
+    output: all_sizes_data_for_lal, all_sizes_labels_for_lal -- in the order of generatelal.py, by depth and then by dataset'''
+
+    n_labelleds = experiment['n_labelleds']
+    if n_labelleds[0]!=2 or np.any(np.diff(n_labelleds)!=1):
+        raise ValueError('a trajectory goes through all the depths from 2')
+    n_points = experiment['n_points_per_experiment']
+    lalModels = []
+    trees = []
+    for i_dataset in range(experiment['n_datasets']):
+        dataset = DatasetSimulated(nDatapoints, experiment['n_dim'])
+        tree = Tree4LAL(experiment['treegrowing'], dataset, lalModels, experiment['method'], headless=True)
+        tree.startTrajectory()
+        trees.append(tree)
+
+    all_sizes_data_for_lal = np.empty((len(n_labelleds)*len(trees)*n_points, N_FEATURES))
+    all_sizes_labels_for_lal = np.empty(len(n_labelleds)*len(trees)*n_points)
+    nRows = 0
+    for n_labelled in n_labelleds:
+        print()
+        print('n_lablled = ', n_labelled)
+        levelStart = nRows
+        for tree in trees:
+            print('*', end='')
+            data_for_lal, labels_for_lal = tree.getLALdatapoints(n_points)
+            if experiment['treegrowing']=='random':
+                # only the iterative trees need their forest again in growOne, which frees it
+                tree.model = None
+            all_sizes_data_for_lal[nRows:nRows+np.size(labels_for_lal)] = data_for_lal
+            all_sizes_labels_for_lal[nRows:nRows+np.size(labels_for_lal)] = labels_for_lal
+            nRows += np.size(labels_for_lal)
+
+        if n_labelled==n_labelleds[-1]:
+            break
+        if experiment['treegrowing']=='iterative':
+            # for every size of the tree train a lal model and attach it to the list of models for all sizes of trees
+            lalModel = LALmodel(all_sizes_data_for_lal[levelStart:nRows], all_sizes_labels_for_lal[levelStart:nRows])
+            lalModel.crossValidateLALmodel()
+            lalModels.append(lalModel.model)
+        for tree in trees:
+            tree.growOne()
+    return all_sizes_data_for_lal[:nRows], all_sizes_labels_for_lal[:nRows]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Generate the training data of the LAL regressors from one growing tree per dataset')
+    parser.add_argument('treegrowing', choices=['random', 'iterative'], help='random adds random samples, iterative adds the samples chosen by the LAL models of the previous depths')
+    args = parser.parse_args()
+    experiment['treegrowing'] = args.treegrowing
+
+    np.random.seed(805)
+    all_sizes_data_for_lal, all_sizes_labels_for_lal = generateTrajectories(experiment)
+
+    print(all_sizes_data_for_lal.shape)
+    print(all_sizes_labels_for_lal.shape)
+
+    # the datapoints are ordered by depth, then by dataset
+    n_points = experiment['n_points_per_experiment']
+    n_labelled = np.repeat(experiment['n_labelleds'], experiment['n_datasets']*n_points)
+    dataset = np.tile(np.repeat(np.arange(experiment['n_datasets']), n_points), len(experiment['n_labelleds']))
+    os.makedirs('./lal datasets/trajectory', exist_ok=True)
+    np.savez('./lal datasets/trajectory/LAL-%stree-trajectory-simulated2Gauss2dim' % args.treegrowing, all_sizes_data_for_lal, all_sizes_labels_for_lal,
+             generation='trajectory', n_labelled=n_labelled, dataset=dataset)
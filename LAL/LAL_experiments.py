@@ -14,6 +14,7 @@ from LAL.Classes.dataset import DatasetRotatedCheckerboard2x2
 from LAL.Classes.dataset import DatasetStriatumMini
 # import the model for LAL strategy
 from LAL.Classes.lal_model import LALmodel
+from LAL.Classes.lal_forest import loadForest
 # import Experiment and Result classes that will be responsible for running AL and saving the results
 from LAL.Classes.experiment import Experiment
 from LAL.Classes.results import Results
@@ -25,42 +26,27 @@ import random
 # LALindependent strategy
 
 fn = 'LAL-randomtree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 2000, 'depth': 40, 'feat': 6 }
+# the training data of the regressor is only loaded for the SGD regressors below
 filename = './lal datasets/'+fn
 regression_data1 = np.load(filename)
 regression_features1 = regression_data1['arr_0']
 regression_labels1 = regression_data1['arr_1']
 
-print('Building lal regression model..')
-lalModel1 = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'], 
-                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
-
-lalModel1.fit(regression_features1, np.ravel(regression_labels1))    
-
-print('Done!')
-print('Oob score = ', lalModel1.oob_score_)
+# the regressor is fitted once by export_lal_models.py, here its exported node arrays are memory-mapped
+lalModel1 = loadForest('./lal models/'+fn[:-4])
 
 # LALiterative strategy
 
 fn = 'LAL-iterativetree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 1000, 'depth': 40, 'feat': 6 }
 filename = './lal datasets/'+fn
 regression_data2 = np.load(filename)
 regression_features2 = regression_data2['arr_0']
 regression_labels2 = regression_data2['arr_1']
 
-print('Building lal regression model..')
-lalModel2 = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'], 
-                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
-
-lalModel2.fit(regression_features2, np.ravel(regression_labels2))    
+lalModel2 = loadForest('./lal models/'+fn[:-4])
 
-print('Done!')
-print('Oob score = ', lalModel2.oob_score_)
-
-# SGD
+# SGD, with seeded random states: a checkpoint is only continued with the same regressors
+random.seed(805)
 print('Building sgd1 regression model..')
 SGD1 = SGDRegressor(loss="squared_loss", penalty="l2", alpha=0.02, max_iter=100, random_state=random.randrange(100000))
 SGD1.fit(regression_features1, regression_labels1)
@@ -104,17 +90,13 @@ exp = Experiment(nIterations, nEstimators, quality_metrics, dtstcheckerboard2x2,
 # the Results class helps to add, save and plot results of the experiments
 res = Results(exp, nExperiments)
 
-for i in range(nExperiments):
-    print('\n experiment #'+str(i+1))
-    # run an experiment
-    performance = exp.run()
-    res.addPerformance(performance)
-    # reset the experiment (including sampling a new starting state for the dataset)
-    exp.reset()
+# run the replicas, a checkpoint lets a restarted script skip the finished replicas and continue the interrupted one
+exp.runAll(nExperiments, res, './exp/checkerboard2x2-exp.checkpoint')
 
 print()
 res.saveResults('checkerboard2x2-exp')
 print('checkerboard2x2-exp done')
+print(res.timingTable())
 # res2plot = Results()
 # res2plot.readResult('checkerboard2x2-exp')
 # res2plot.plotResults(metrics = ['accuracy'])
@@ -137,17 +119,13 @@ exp = Experiment(nIterations, nEstimators, quality_metrics, dtstCheckerboard4x4,
 # the Results class helps to add, save and plot results of the experiments
 res = Results(exp, nExperiments)
 
-for i in range(nExperiments):
-    print('\n experiment #'+str(i+1))
-    # run an experiment
-    performance = exp.run()
-    res.addPerformance(performance)
-    # reset the experiment (including sampling a new starting state for the dataset)
-    exp.reset()
+# run the replicas, a checkpoint lets a restarted script skip the finished replicas and continue the interrupted one
+exp.runAll(nExperiments, res, './exp/checkerboard4x4-exp.checkpoint')
 
 print()    
 res.saveResults('checkerboard4x4-exp')
 print('checkerboard4x4-exp done')
+print(res.timingTable())
 # res2plot = Results()
 # res2plot.readResult('checkerboard4x4-exp')
 # res2plot.plotResults(metrics = ['accuracy'])
@@ -171,17 +149,13 @@ exp = Experiment(nIterations, nEstimators, quality_metrics, dtstRotatedCheckerbo
 # the Results class helps to add, save and plot results of the experiments
 res = Results(exp, nExperiments)
 
-for i in range(nExperiments):
-    print('\n experiment #'+str(i+1))
-    # run an experiment
-    performance = exp.run()
-    res.addPerformance(performance)
-    # reset the experiment (including sampling a new starting state for the dataset)
-    exp.reset()
+# run the replicas, a checkpoint lets a restarted script skip the finished replicas and continue the interrupted one
+exp.runAll(nExperiments, res, './exp/rotated-checkerboard2x2-exp.checkpoint')
 
 print()
 res.saveResults('rotated-checkerboard2x2-exp')
 print('rotated-checkerboard2x2-exp done')
+print(res.timingTable())
 # res2plot = Results()
 # res2plot.readResult('rotated-checkerboard2x2-exp')
 # res2plot.plotResults(metrics = ['accuracy'])
@@ -203,17 +177,13 @@ exp = Experiment(nIterations, nEstimators, quality_metrics, dtstStriatumMini, al
 # the Results class helps to add, save and plot results of the experiments
 res = Results(exp, nExperiments)
 
-for i in range(nExperiments):
-    print('\n experiment #'+str(i+1))
-    # run an experiment
-    performance = exp.run()
-    res.addPerformance(performance)
-    # reset the experiment (including sampling a new starting state for the dataset)
-    exp.reset()
+# run the replicas, a checkpoint lets a restarted script skip the finished replicas and continue the interrupted one
+exp.runAll(nExperiments, res, './exp/striatum-exp.checkpoint')
 
 print()
 res.saveResults('striatum-exp')
 print('striatum-exp done')
+print(res.timingTable())
 # res2plot = Results()
 # res2plot.readResult('striatum-exp')
 # res2plot.plotResults(metrics = ['IoU'])
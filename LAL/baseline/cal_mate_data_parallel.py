@@ -0,0 +1,272 @@
+"""
+The meta data of cal_mate_data.py computed in a pool of processes.
+
+Every (split, model) pair is a unit of work with its own random stream that
+writes its meta data rows and performance improvements to a shard file, so the
+result does not depend on the number of processes, the memory of a worker is
+bounded by one unit and a restarted run skips the shards that exist. The
+distance matrix is computed once into a memory-mapped file shared by all the
+workers, and the shards are merged into preallocated .npy files at the end.
+
+The configuration the shards are computed with is written to manifest.json in
+the folder, and a run with another configuration is refused instead of mixing
+its shards with the existing ones.
+
+The deterministic models (meta_data.is_deterministic) of a class of
+meta_data.model_classes give the same outputs on the same labelled indexes, so
+their units are seeded like the first model of the class and have the same
+meta data. With config['deduplicate'], such a class is computed once and its
+shard is written for every member, without it every member computes its own.
+The randomised models keep one unit and one random stream per model.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+
+from meta_data import DataSet, is_deterministic, mate_data_1, model_classes, model_select
+
+
+def meta_data_unit(X, y, distance, cluster_center_index, label_ind, unlabel_ind, test, model, modelname, N=10):
+    """The meta data of N lookahead queries after five random rounds, as in cal_mate_data.py.
+
+    Parameters
+    ----------
+    X, y: the dataset.
+
+    distance: 2D or DistanceMatrix
+
+    label_ind, unlabel_ind, test: np.ndarray
+        The initial label, unlabel and test indexes of the split.
+
+    model: sklearn model
+        The unfitted model, cloned for every round.
+
+    modelname: str
+        'RFR' and 'DTR' are regressors whose outputs are used as they are.
+
+    Returns
+    -------
+    metadata: 2D array [N, n_metafeatures]
+
+    perf_impr: 1D array [N]
+        The improvement of the accuracy on test by labelling every query.
+    """
+    l_ind = label_ind
+    u_ind = unlabel_ind
+    modelOutput = []
+    modelPerformance = []
+    labelindex = []
+    unlabelindex = []
+    # genearte five rounds before
+    for i in range(5):
+        i_sampelindex = np.random.choice(u_ind)
+        u_ind = u_ind[u_ind != i_sampelindex]
+        l_ind = np.r_[l_ind, i_sampelindex]
+        labelindex.append(l_ind)
+        unlabelindex.append(u_ind)
+        i_output = _model_output(model, modelname, X, y, l_ind)
+        modelOutput.append(i_output)
+        modelPerformance.append(accuracy_score(y[test], np.where(i_output > 0, 1, -1)[test]))
+
+    # calualate the meta data z(designed features) and r(performance improvement)
+    metadata = None
+    perf_impr = np.empty(N)
+    for j in range(N):
+        j_sampelindex = np.random.choice(u_ind)
+        j_u_ind = u_ind[u_ind != j_sampelindex]
+        j_l_ind = np.r_[l_ind, j_sampelindex]
+        j_output = _model_output(model, modelname, X, y, j_l_ind)
+        # the five rounds are shared by all the queries, only the sixth one is the query's own
+        j_meta_data = mate_data_1(X, y, distance, cluster_center_index, labelindex + [j_l_ind], unlabelindex + [j_u_ind],
+            modelOutput + [j_output], j_sampelindex)
+        if metadata is None:
+            metadata = np.empty((N, np.size(j_meta_data)))
+        metadata[j] = j_meta_data
+        perf_impr[j] = accuracy_score(y[test], np.where(j_output > 0, 1, -1)[test]) - modelPerformance[4]
+    return metadata, perf_impr
+
+
+def run_units(config, folder, n_processes=None):
+    """Compute the shards of all the (split, model) units of config that are not in folder yet.
+
+    Parameters
+    ----------
+    config: dict
+        'dataset', 'dataset_path', 'modelnames', 'split_count', 'N', 'seed',
+        optionally 'deduplicate'.
+
+    n_processes: int, optional (default=all the cores)
+
+    Returns
+    -------
+    units: list
+        All the units, in the order of the merged meta data.
+
+    n_computed: int
+        The units computed by this run, the shards of the other missing units
+        are copies of the one of their class.
+    """
+    os.makedirs(folder, exist_ok=True)
+    _check_manifest(folder, config)
+    # the split and the cluster centers are drawn once and shared by all the units
+    np.random.seed(config['seed'])
+    dataset = DataSet(config['dataset'], dataset_path=config['dataset_path'])
+    trains, tests, label_inds, unlabel_inds = dataset.split_data(test_ratio=0.3, initial_label_rate=0.05, split_count=config['split_count'], saving_path=None)
+    _, cluster_center_index = dataset.get_cluster_center()
+    distance_path = os.path.join(folder, 'distance.npy')
+    dataset.get_distance(path=distance_path)
+
+    units = [(t, m, k) for t in range(config['split_count']) for m in range(len(config['modelnames']))
+             for k in range(len(model_select(config['modelnames'][m])))]
+    # a task is the index of the model its unit is seeded by and the units it writes
+    tasks = []
+    for t in range(config['split_count']):
+        for m in range(len(config['modelnames'])):
+            for members in _seed_classes(config['modelnames'][m]):
+                missing = [(t, m, k) for k in members if not os.path.exists(_shard_path(folder, config, (t, m, k)))]
+                if config.get('deduplicate', False) and len(missing) > 0:
+                    tasks.append((members[0], missing))
+                else:
+                    tasks.extend((members[0], [unit]) for unit in missing)
+    state = (config, folder, dataset.X, dataset.y, distance_path, cluster_center_index, tests, label_inds, unlabel_inds)
+    if n_processes == 1:
+        _init_worker(*state)
+        counts = [_run_task(task) for task in tasks]
+    elif len(tasks) > 0:
+        pool = multiprocessing.Pool(min(n_processes or os.cpu_count(), len(tasks)), _init_worker, state)
+        try:
+            counts = list(pool.imap_unordered(_run_task, tasks))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        counts = []
+    return units, sum(counts)
+
+
+def merge_shards(config, folder, units, output):
+    """Copy the shards of units into output_metadata.npy and output_perf_impr.npy,
+    preallocated on disk and filled one shard at a time."""
+    _check_manifest(folder, config)
+    sizes = []
+    for unit in units:
+        with np.load(_shard_path(folder, config, unit)) as shard:
+            sizes.append(np.shape(shard['metadata']))
+    if any(size != (config['N'], sizes[0][1]) for size in sizes):
+        raise ValueError('the shards of %s do not all have %d rows of %d meta features' % (folder, config['N'], sizes[0][1]))
+    n_rows = sum(size[0] for size in sizes)
+    metadata = np.lib.format.open_memmap(output + '_metadata.npy', mode='w+', shape=(n_rows, sizes[0][1]))
+    perf_impr = np.lib.format.open_memmap(output + '_perf_impr.npy', mode='w+', shape=(n_rows,))
+    start = 0
+    for unit, size in zip(units, sizes):
+        with np.load(_shard_path(folder, config, unit)) as shard:
+            metadata[start:start + size[0]] = shard['metadata']
+            perf_impr[start:start + size[0]] = shard['perf_impr']
+        start += size[0]
+    metadata.flush()
+    perf_impr.flush()
+    return metadata, perf_impr
+
+
+# the configuration in the manifest of a folder of shards, a run only continues the shards of the same configuration
+MANIFEST_KEYS = ['dataset', 'dataset_path', 'split_count', 'N', 'seed']
+
+# state of a worker process, set once by _init_worker instead of being sent with every unit
+_state = None
+
+
+def _init_worker(config, folder, X, y, distance_path, cluster_center_index, tests, label_inds, unlabel_inds):
+    global _state
+    # the distance matrix exists already, every worker maps the same file
+    distance = DataSet(config['dataset'], X=X, y=y).get_distance(path=distance_path)
+    _state = (config, folder, X, y, distance, cluster_center_index, tests, label_inds, unlabel_inds)
+
+
+def _run_task(task):
+    # the units of a task have the same meta data, it is computed by the first one
+    seed_k, units = task
+    config, folder, X, y, distance, cluster_center_index, tests, label_inds, unlabel_inds = _state
+    t, m, k = units[0]
+    modelname = config['modelnames'][m]
+    # seeded by the model name rather than its position, like the shard names
+    np.random.seed(np.random.SeedSequence([config['seed'], t, seed_k] + list(modelname.encode())).generate_state(1)[0])
+    model = model_select(modelname)[k]
+    metadata, perf_impr = meta_data_unit(X, y, distance, cluster_center_index, label_inds[t], unlabel_inds[t], tests[t],
+        model, modelname, config['N'])
+    for unit in units:
+        path = _shard_path(folder, config, unit)
+        # a shard is complete once it has its final name
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, metadata=metadata, perf_impr=perf_impr)
+        os.replace(path + '.tmp', path)
+    return 1
+
+
+def _check_manifest(folder, config):
+    # the model names are not part of it, the shards are named by them and a run can add models
+    manifest = dict((key, config.get(key)) for key in MANIFEST_KEYS)
+    path = os.path.join(folder, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        different = [key for key in MANIFEST_KEYS if saved.get(key) != manifest[key]]
+        if different:
+            raise ValueError('the shards in %s were computed with another %s, use another folder or remove it'
+                             % (folder, ', '.join(different)))
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def _shard_path(folder, config, unit):
+    t, m, k = unit
+    return os.path.join(folder, '%d-%s-%d.npz' % (t, config['modelnames'][m], k))
+
+
+def _seed_classes(modelname):
+    # the models seeded by the same unit, the first of every class; a randomised model is its own class
+    models, classes = model_classes(modelname)
+    seed_classes = []
+    for members in classes:
+        if is_deterministic(models[members[0]]):
+            seed_classes.append(members)
+        else:
+            seed_classes.extend([k] for k in members)
+    return seed_classes
+
+
+def _model_output(model, modelname, X, y, l_ind):
+    model_i = clone(model)
+    model_i.fit(X[l_ind], y[l_ind].ravel())
+    if modelname in ['RFR', 'DTR']:
+        return model_i.predict(X)
+    return (model_i.predict_proba(X)[:, 1] - 0.5) * 2
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Meta data of the baseline in a pool of processes')
+    parser.add_argument('dataset', help='name of the .mat dataset in dataset_path')
+    parser.add_argument('--dataset_path', default='./data/')
+    parser.add_argument('--models', nargs='+', default=['DTR'], help="of 'KNN', 'LR', 'RFC', 'RFR', 'DTC', 'DTR', 'SVM', 'GBDT'")
+    parser.add_argument('--splits', type=int, default=2)
+    parser.add_argument('--N', type=int, default=10, help='lookahead queries per unit')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--deduplicate', action='store_true', help='compute the deterministic models with the same outputs once')
+    args = parser.parse_args()
+
+    config = {'dataset': args.dataset, 'dataset_path': args.dataset_path, 'modelnames': args.models,
+              'split_count': args.splits, 'N': args.N, 'seed': args.seed, 'deduplicate': args.deduplicate}
+    folder = os.path.join('./metadata', args.dataset)
+    units, n_computed = run_units(config, folder, args.processes)
+    print('units computed: %d of %d' % (n_computed, len(units)))
+    metadata, perf_impr = merge_shards(config, folder, units, os.path.join('./metadata', args.dataset))
+    print(np.shape(metadata))
+    print(np.shape(perf_impr))
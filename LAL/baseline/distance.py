@@ -0,0 +1,188 @@
+"""
+Euclidean distances between the samples of a dataset, computed in blocks with
+matrix products in float32, kept in memory, in a memory-mapped file or
+computed row by row on demand.
+"""
+import os
+
+import numpy as np
+
+
+def pairwise_distances_blocked(X, Y=None, block_size=1024, dtype=np.float32, out=None):
+    """Euclidean distances between the rows of X and the rows of Y, computed
+    block of rows by block of rows as ||x||^2 + ||y||^2 - 2 x.y with matrix products.
+    The absolute error grows like the square root of the rounding error of the
+    squared norms, so identical samples of X and Y can be at a small positive distance.
+
+    Parameters
+    ----------
+    X: 2D array [n_samples_X, n_features]
+
+    Y: 2D array, optional (default=X) [n_samples_Y, n_features]
+
+    block_size: int
+        The number of rows of X whose distances are computed at once.
+
+    dtype: numpy dtype
+        The precision of the computation and of the result.
+
+    out: 2D array, optional (default=None) [n_samples_X, n_samples_Y]
+        The array to write the distances to, e.g. a memory-mapped file.
+
+    Returns
+    -------
+    distance: 2D array [n_samples_X, n_samples_Y]
+        distance[i][j] reprensts the distance between X[i] and Y[j].
+    """
+    symmetric = Y is None
+    X, Y = _centered(X, X if symmetric else Y, dtype)
+    Y_norms = np.einsum('ij,ij->i', Y, Y)
+    if out is None:
+        out = np.empty((np.shape(X)[0], np.shape(Y)[0]), dtype=dtype)
+    for start in range(0, np.shape(X)[0], block_size):
+        block = _distance_block(X[start:start + block_size], Y, Y_norms)
+        if symmetric:
+            # the distance of a sample to itself is 0 exactly, not a rounding error
+            rows = np.arange(np.shape(block)[0])
+            block[rows, start + rows] = 0
+        out[start:start + block_size] = block
+    return out
+
+
+def nearest_samples(X, centers, block_size=65536):
+    """The sample of X closest to every center, found by streaming over blocks of
+    rows of X, so that X can be a memory-mapped array of millions of rows.
+    Ties go to the first sample.
+
+    Parameters
+    ----------
+    X: 2D array [n_samples, n_features]
+
+    centers: 2D array [n_centers, n_features]
+
+    Returns
+    -------
+    index: np.ndarray [n_centers]
+        The index of the closest sample of every center.
+    distance: np.ndarray [n_centers]
+        Its distance to the center.
+    """
+    index = np.zeros(np.shape(centers)[0], dtype=int) - 1
+    closest = np.zeros(np.shape(centers)[0]) + np.inf
+    for start in range(0, np.shape(X)[0], block_size):
+        # float64, so that the closest samples are the same as with np.linalg.norm
+        block = pairwise_distances_blocked(X[start:start + block_size], centers, block_size=block_size, dtype=np.float64)
+        block_index = np.argmin(block, axis=0)
+        block_closest = block[block_index, np.arange(np.shape(centers)[0])]
+        better = block_closest < closest
+        index[better] = start + block_index[better]
+        closest[better] = block_closest[better]
+    return index, closest
+
+
+class DistanceMatrix():
+    """The n_samples x n_samples matrix of Euclidean distances of X, whose rows are
+    computed on demand, so that distance[i][j] works as with a dense matrix
+    without the matrix being in memory. If a path is given, the whole matrix is
+    computed once into a memory-mapped .npy file, which is reused if it exists
+    with the right shape.
+
+    Parameters
+    ----------
+    X: 2D array [n_samples, n_features]
+        Feature matrix of the whole dataset. It is a reference which will not use additional memory
+        (besides a centered float32 copy).
+
+    path: str, optional (default=None)
+        The .npy file of the memory-mapped matrix.
+
+    block_size: int
+        The number of rows computed at once.
+    """
+    def __init__(self, X, path=None, block_size=1024, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.path = path
+        self.shape = (np.shape(X)[0], np.shape(X)[0])
+        self._X, _ = _centered(X, X, self.dtype)
+        self._norms = np.einsum('ij,ij->i', self._X, self._X)
+        self._matrix = None
+        if path is not None:
+            self._matrix = self._open(path)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        """distance[i] is the row i, distance[i, j] the distance between X[i] and X[j],
+        distance[rows] the rows of an index array or a slice."""
+        if self._matrix is not None:
+            return self._matrix[index]
+        if isinstance(index, tuple):
+            rows, columns = index
+            return self[rows][..., columns]
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return self.rows([index])[0]
+        return self.rows(np.arange(self.shape[0])[index])
+
+    def rows(self, indices):
+        """The rows of the samples indices, an array [len(indices), n_samples]."""
+        indices = np.asarray(indices)
+        if self._matrix is not None:
+            return self._matrix[indices]
+        block = _distance_block(self._X[indices], self._X, self._norms)
+        block[np.arange(np.size(indices)), indices] = 0
+        return block
+
+    def take(self, rows, columns):
+        """The distances between the samples rows and the samples columns, an array
+        [len(rows), len(columns)], computed without the whole rows."""
+        rows = np.asarray(rows)
+        columns = np.asarray(columns)
+        if self._matrix is not None:
+            return self._matrix[np.ix_(rows, columns)]
+        block = _distance_block(self._X[rows], self._X[columns], self._norms[columns])
+        block[rows[:, np.newaxis] == columns[np.newaxis, :]] = 0
+        return block
+
+    def toarray(self):
+        """The whole matrix in memory."""
+        if self._matrix is not None:
+            return np.array(self._matrix)
+        return self._fill(np.empty(self.shape, dtype=self.dtype))
+
+    def _fill(self, out):
+        for start in range(0, self.shape[0], self.block_size):
+            out[start:start + self.block_size] = self.rows(np.arange(start, min(start + self.block_size, self.shape[0])))
+        return out
+
+    def _open(self, path):
+        if os.path.exists(path):
+            matrix = np.load(path, mmap_mode='r')
+            if matrix.shape == self.shape and matrix.dtype == self.dtype:
+                return matrix
+        # written under a temporary name first, so that an interrupted computation is not taken for a complete matrix
+        tmp = path + '.tmp%d.npy' % os.getpid()
+        matrix = np.lib.format.open_memmap(tmp, mode='w+', dtype=self.dtype, shape=self.shape)
+        self._fill(matrix)
+        matrix.flush()
+        del matrix
+        os.replace(tmp, path)
+        return np.load(path, mmap_mode='r')
+
+
+def _centered(X, Y, dtype):
+    # distances do not change by a translation, centering reduces the cancellation in ||x||^2 + ||y||^2 - 2 x.y
+    mean = np.mean(X, axis=0)
+    X_centered = np.ascontiguousarray(np.asarray(X, dtype=np.float64) - mean, dtype=dtype)
+    if Y is X:
+        return X_centered, X_centered
+    return X_centered, np.ascontiguousarray(np.asarray(Y, dtype=np.float64) - mean, dtype=dtype)
+
+
+def _distance_block(X_block, Y, Y_norms):
+    squared = np.einsum('ij,ij->i', X_block, X_block)[:, np.newaxis] + Y_norms[np.newaxis, :]
+    squared -= 2 * np.dot(X_block, Y.T)
+    # rounding can make the squared distance of close samples slightly negative
+    np.maximum(squared, 0, out=squared)
+    return np.sqrt(squared, out=squared)
@@ -3,16 +3,18 @@ Meta features designing for binary classification tasks
  in the pool based active learning scenario.
 """
 import os
+
 import h5py
 import numpy as np 
 
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import confusion_matrix
 from sklearn.preprocessing import Normalizer,minmax_scale
 from sklearn.utils.validation import check_array
 from sklearn.datasets import make_classification
 from sklearn.svm import SVC
 
+from distance import DistanceMatrix, nearest_samples, pairwise_distances_blocked
 from model import naive_bayes_classifier, knn_classifier, logistic_regression_classifier, \
     random_forest_classifier, decision_tree_classifier, svm_classifier, svm_cross_validation, gradient_boosting_classifier
 
@@ -103,13 +105,20 @@ class DataSet():
         self.X = np.transpose(dt['x'])
         self.y = np.transpose(dt['y'])
     
-    def get_cluster_center(self, n_clusters=10, method='Euclidean'):
+    def get_cluster_center(self, n_clusters=10, method='Euclidean', large=False, sample_size=100000, batch_size=4096):
         """Use the Kmeans in sklearn to get the cluster centers.
 
         Parameters
         ----------
         n_clusters: int 
             The number of cluster centers.
+        large: bool
+            If True, the centers are found by MiniBatchKMeans on a random subsample
+            of sample_size samples, for datasets with millions of samples.
+        sample_size: int
+            The size of the subsample of the large mode.
+        batch_size: int
+            The size of the mini batches of the large mode.
         Returns
         -------
         data_cluster_centers: np.ndarray
@@ -117,49 +126,53 @@ class DataSet():
         index_cluster_centers: np.ndarray
             The index corresponding to the samples in origin data set.     
         """
-        # if self.distance is None:
-        #     self.get_distance()
-        data_cluster = KMeans(n_clusters=n_clusters, random_state=0).fit(self.X)
+        if method != 'Euclidean':
+            raise ValueError("Only the Euclidean distance is implemented.")
+        if large:
+            sample = np.arange(self.n_samples)
+            if self.n_samples > sample_size:
+                sample = np.sort(np.random.RandomState(0).choice(self.n_samples, sample_size, replace=False))
+            data_cluster = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=0).fit(self.X[sample])
+        else:
+            data_cluster = KMeans(n_clusters=n_clusters, random_state=0).fit(self.X)
         data_origin_cluster_centers = data_cluster.cluster_centers_
-        closest_distance_data_cluster_centers = np.zeros(n_clusters) + np.infty
-        index_cluster_centers = np.zeros(n_clusters, dtype=int) - 1
- 
-        # obtain the cluster centers index
-        for i in range(self.n_samples):
-            for j in range(n_clusters):
-                if method == 'Euclidean':
-                    distance = np.linalg.norm(self.X[i] - data_origin_cluster_centers[j])
-                    if distance < closest_distance_data_cluster_centers[j]:
-                        closest_distance_data_cluster_centers[j] = distance
-                        index_cluster_centers[j] = i
+
+        # obtain the cluster centers index, streaming over all the samples
+        index_cluster_centers, _ = nearest_samples(self.X, data_origin_cluster_centers)
 
         if(np.any(index_cluster_centers == -1)):
             raise IndexError("data_cluster_centers_index is wrong")
 
         return self.X[index_cluster_centers], index_cluster_centers
 
-    def get_distance(self, method='Euclidean'):
+    def get_distance(self, method='Euclidean', lazy=False, path=None, block_size=1024):
         """
 
         Parameters
         ----------
         method: str
             The method calculate the distance.
+        lazy: bool
+            If True, return a DistanceMatrix whose rows are computed when they are accessed.
+        path: str, optional (default=None)
+            If given, the matrix is computed into this memory-mapped .npy file,
+            or read from it if it exists, and a DistanceMatrix on the file is returned.
+        block_size: int
+            The number of rows computed at once.
         Returns
         -------
         distance_martix: 2D
-            D[i][j] reprensts the distance between X[i] and X[j].
+            D[i][j] reprensts the distance between X[i] and X[j], in float32.
         """
         if self.n_samples == 1:
             raise ValueError("There is only one sample.")
-        
-        distance = np.zeros((self.n_samples, self.n_samples))
-        for i in range(1, self.n_samples):
-            for j in range(i+1, self.n_samples):
-                if method == 'Euclidean':
-                    distance[i][j] = np.linalg.norm(self.X[i] - self.X[j])
-        
-        self.distance = distance + distance.T
+        if method != 'Euclidean':
+            raise ValueError("Only the Euclidean distance is implemented.")
+
+        if lazy or path is not None:
+            self.distance = DistanceMatrix(self.X, path=path, block_size=block_size)
+        else:
+            self.distance = pairwise_distances_blocked(self.X, block_size=block_size)
         return self.distance
     
     def split_data(self, test_ratio=0.3, initial_label_rate=0.05, split_count=10, saving_path='.'):
@@ -392,6 +405,8 @@ def mate_data(X, y, distance, cluster_center_index, label_indexs, unlabel_indexs
     cc_sort_index = []
 
     for i in query_index:
+        # the row of the query is fetched once
+        i_row = distance[i]
         i_cc = []
         i_l10e = []
         i_u10e = []
@@ -400,9 +415,9 @@ def mate_data(X, y, distance, cluster_center_index, label_indexs, unlabel_indexs
             # i_cc.append(np.linalg.norm(X[i] - data_cluster_centers_10[j]))
             # i_l10e.append(np.linalg.norm(X[i] - label_10_equal[j]))
             # i_u10e.append(np.linalg.norm(X[i] - unlabel_10_equal[j]))
-            i_cc.append(distance[i][cluster_center_index[j]])
-            i_l10e.append(distance[i][label_10_equal_index[j]])
-            i_u10e.append(distance[i][unlabel_10_equal_index[j]])
+            i_cc.append(i_row[cluster_center_index[j]])
+            i_l10e.append(i_row[label_10_equal_index[j]])
+            i_u10e.append(i_row[unlabel_10_equal_index[j]])
 
         i_cc = minmax_scale(i_cc)
         i_cc_sort_index = np.argsort(i_cc)
@@ -499,7 +514,8 @@ def mate_data_1(X, y, distance, cluster_center_index, label_indexs, unlabel_inde
         The true label of the each round of iteration,corresponding to label_indexs.
     
     distance: 2D
-        distance[i][j] reprensts the distance between X[i] and X[j].
+        distance[i][j] reprensts the distance between X[i] and X[j]. Only the row
+        distance[query_index] is read, so it can be a lazy DistanceMatrix.
 
     cluster_center_index: np.ndarray
         The index corresponding to the samples which is the result of cluster in origin data set.  
@@ -551,13 +567,15 @@ def mate_data_1(X, y, distance, cluster_center_index, label_indexs, unlabel_inde
     sorted_current_unlabel_data = X[unlabel_indexs[5][sorted_unlabelperdiction_index]]
     unlabel_10_equal_index = [unlabel_indexs[5][sorted_unlabelperdiction_index][int(i * current_unlabel_size)] for i in np.arange(0, 1, 0.1)]
      
+    # the row of the query is fetched once
+    query_distance = distance[query_index]
     cc = []
     l10e = []
     u10e = []
     for j in range(10):
-        cc.append(distance[query_index][cluster_center_index[j]])
-        l10e.append(distance[query_index][label_10_equal_index[j]])
-        u10e.append(distance[query_index][unlabel_10_equal_index[j]])
+        cc.append(query_distance[cluster_center_index[j]])
+        l10e.append(query_distance[label_10_equal_index[j]])
+        u10e.append(query_distance[unlabel_10_equal_index[j]])
 
     cc = minmax_scale(cc)
     cc_sort_index = np.argsort(cc)
@@ -565,6 +583,27 @@ def mate_data_1(X, y, distance, cluster_center_index, label_indexs, unlabel_inde
     u10e = minmax_scale(u10e)
     distance_query_data = np.hstack((cc[cc_sort_index], l10e, u10e))
 
+    model_infor = _model_infor(y, label_indexs, unlabel_indexs, modelOutput, current_prediction)
+
+    f_x_a = []
+    f_x_c = []
+    f_x_d = []
+    for round in range(6):
+        model_output = minmax_scale(modelOutput[round])
+        for j in range(10):
+            f_x_a.append(model_output[query_index] - model_output[cluster_center_index[cc_sort_index[j]]])
+        for j in range(10):
+            f_x_c.append(model_output[query_index] - model_output[label_10_equal_index[j]])
+        for j in range(10):
+            f_x_d.append(model_output[query_index] - model_output[unlabel_10_equal_index[j]])
+    fdata = np.hstack((current_prediction[query_index], f_x_a, f_x_c, f_x_d))
+
+    metadata = np.hstack((n_feature, ratio_label_positive, ratio_label_negative, \
+         ratio_unlabel_positive, ratio_unlabel_negative, distance_query_data, model_infor, fdata))
+    return metadata
+
+def _model_infor(y, label_indexs, unlabel_indexs, modelOutput, current_prediction):
+    """The meta data about the models of the six rounds, which does not depend on the query."""
     ratio_tn = []
     ratio_fp = []
     ratio_fn = []
@@ -606,23 +645,111 @@ def mate_data_1(X, y, distance, cluster_center_index, label_indexs, unlabel_inde
         unlabelstd.append(np.std(i_unlabel_10_equal))
     model_infor = np.hstack((ratio_tp, ratio_fp, ratio_tn, ratio_fn, label_pre_10_equal, labelmean, labelstd, \
          round5_ratio_unlabel_positive, round5_ratio_unlabel_negative, unlabel_pre_10_equal, unlabelmean, unlabelstd))
+    return model_infor
 
-    f_x_a = []
-    f_x_c = []
-    f_x_d = []
-    for round in range(6):
-        model_output = minmax_scale(modelOutput[round])
-        for j in range(10):
-            f_x_a.append(model_output[query_index] - model_output[cluster_center_index[cc_sort_index[j]]])
-        for j in range(10):
-            f_x_c.append(model_output[query_index] - model_output[label_10_equal_index[j]])
-        for j in range(10):
-            f_x_d.append(model_output[query_index] - model_output[unlabel_10_equal_index[j]])
-    fdata = np.hstack((current_prediction[query_index], f_x_a, f_x_c, f_x_d))
 
-    metadata = np.hstack((n_feature, ratio_label_positive, ratio_label_negative, \
-         ratio_unlabel_positive, ratio_unlabel_negative, distance_query_data, model_infor, fdata))
-    return metadata
+class MetaFeatureRound():
+    """The parts of the meta data of mate_data_1 that depend only on the dataset and
+    the six rounds of iteration, computed once, so that the meta data of many query
+    candidates is computed at once by features.
+
+    Parameters
+    ----------
+    X, y, cluster_center_index, label_indexs, unlabel_indexs, modelOutput:
+        As in mate_data_1.
+    """
+    def __init__(self, X, y, cluster_center_index, label_indexs, unlabel_indexs, modelOutput):
+        if(np.any(cluster_center_index == -1)):
+            raise IndexError("cluster_center_index is wrong")
+        label_indexs = [np.asarray(label_index) for label_index in label_indexs]
+        unlabel_indexs = [np.asarray(unlabel_index) for unlabel_index in unlabel_indexs]
+        for i in range(6):
+            assert(np.shape(X)[0] == np.shape(modelOutput[i])[0])
+
+        n_samples, n_feature = np.shape(X)
+        current_label_size = len(label_indexs[5])
+        current_label_y = y[label_indexs[5]]
+        current_unlabel_size = len(unlabel_indexs[5])
+        self.current_prediction = np.asarray(modelOutput[5])
+        self.cluster_center_index = np.asarray(cluster_center_index)[0:10]
+
+        self.header = np.array([n_feature,
+            (sum(current_label_y > 0)) / current_label_size,
+            (sum(current_label_y < 0)) / current_label_size,
+            (sum(self.current_prediction[unlabel_indexs[5]] > 0)) / current_unlabel_size,
+            (sum(self.current_prediction[unlabel_indexs[5]] < 0)) / current_unlabel_size], dtype=float)
+
+        deciles = np.arange(0, 1, 0.1)
+        sorted_label_index = label_indexs[5][np.argsort(self.current_prediction[label_indexs[5]])]
+        self.label_10_equal_index = np.array([sorted_label_index[int(i * current_label_size)] for i in deciles])
+        sorted_unlabel_index = unlabel_indexs[5][np.argsort(self.current_prediction[unlabel_indexs[5]])]
+        self.unlabel_10_equal_index = np.array([sorted_unlabel_index[int(i * current_unlabel_size)] for i in deciles])
+
+        # model_infor of mate_data_1, the same for all the queries
+        self.model_infor = _model_infor(y, label_indexs, unlabel_indexs, modelOutput, self.current_prediction)
+        # the model outputs of all the rounds scaled to [0, 1], [6, n_samples]
+        self.scaled_outputs = np.array([minmax_scale(modelOutput[round]) for round in range(6)])
+
+    def features(self, distance, query_indexs):
+        """The meta data of every query, in the order of mate_data_1.
+
+        Parameters
+        ----------
+        distance: 2D or DistanceMatrix
+            distance[i][j] reprensts the distance between X[i] and X[j]. Only the
+            distances between the queries and 30 reference samples are read.
+
+        query_indexs: {list, np.ndarray}
+            The unlabel samples to compute the meta data of.
+
+        Returns
+        -------
+        metadata: 2D array [n_queries, n_metafeatures]
+        """
+        query_indexs = np.asarray(query_indexs)
+        n_queries = np.size(query_indexs)
+        references = np.r_[self.cluster_center_index, self.label_10_equal_index, self.unlabel_10_equal_index]
+        if isinstance(distance, DistanceMatrix):
+            query_distance = distance.take(query_indexs, references)
+        else:
+            query_distance = np.asarray(distance)[np.ix_(query_indexs, references)]
+        # scaled in float64 like the lists of mate_data_1
+        query_distance = query_distance.astype(np.float64)
+        cc = minmax_scale(query_distance[:, 0:10], axis=1)
+        cc_sort_index = np.argsort(cc, axis=1)
+        l10e = minmax_scale(query_distance[:, 10:20], axis=1)
+        u10e = minmax_scale(query_distance[:, 20:30], axis=1)
+        distance_query_data = np.hstack((np.take_along_axis(cc, cc_sort_index, axis=1), l10e, u10e))
+
+        # differences between the scaled outputs of the queries and of the reference samples, [n_queries, 6, 10] each
+        query_outputs = self.scaled_outputs[:, query_indexs].T[:, :, np.newaxis]
+        f_x_a = query_outputs - np.transpose(self.scaled_outputs[:, self.cluster_center_index[cc_sort_index]], (1, 0, 2))
+        f_x_c = query_outputs - self.scaled_outputs[np.newaxis, :, self.label_10_equal_index]
+        f_x_d = query_outputs - self.scaled_outputs[np.newaxis, :, self.unlabel_10_equal_index]
+        fdata = np.hstack((self.current_prediction[query_indexs][:, np.newaxis],
+            f_x_a.reshape(n_queries, -1), f_x_c.reshape(n_queries, -1), f_x_d.reshape(n_queries, -1)))
+
+        return np.hstack((np.tile(self.header, (n_queries, 1)), distance_query_data,
+            np.tile(self.model_infor, (n_queries, 1)), fdata))
+
+
+def mate_data_batch(X, y, distance, cluster_center_index, label_indexs, unlabel_indexs, modelOutput, query_indexs):
+    """The meta data of mate_data_1 for many queries sharing the same rounds of iteration.
+
+    Parameters
+    ----------
+    query_indexs: {list, np.ndarray}
+        The unlabel samples to compute the meta data of.
+
+    The other parameters are the ones of mate_data_1.
+
+    Returns
+    -------
+    metadata: 2D array [n_queries, n_metafeatures]
+        metadata[k] is mate_data_1(..., query_indexs[k]).
+    """
+    return MetaFeatureRound(X, y, cluster_center_index, label_indexs, unlabel_indexs, modelOutput).features(distance, query_indexs)
+
 
 def model_select(modelname):
     """
@@ -742,6 +869,85 @@ def model_select(modelname):
         return models    
 
 
+def prediction_class(model):
+    """The key of the prediction-equivalence class of a model of model_select: two
+    models with the same key give the same outputs when fitted on the same data
+    with the same random state, so that only one of them has to be fitted.
+
+    - KNN: algorithm and leaf_size only change how the neighbors are searched
+      (up to the order of neighbors at exactly the same distance).
+    - SVM: degree is only used by the 'poly' kernel.
+    - RFC, DTC, GBDT: max_features='auto' is 'sqrt' for the classifiers,
+      RFR, DTR: it is None (all the features) for the regressors.
+
+    Parameters
+    ----------
+    model: sklearn model
+
+    Returns
+    -------
+    key: tuple
+        Hashable, the model name and the parameters that change the outputs.
+    """
+    name = type(model).__name__
+    params = model.get_params()
+    if name == 'KNeighborsClassifier':
+        del params['algorithm'], params['leaf_size']
+    elif name == 'SVC' and params['kernel'] != 'poly':
+        params['degree'] = None
+    elif name in ['RandomForestClassifier', 'DecisionTreeClassifier', 'GradientBoostingClassifier'] and params['max_features'] == 'auto':
+        params['max_features'] = 'sqrt'
+    elif name in ['RandomForestRegressor', 'DecisionTreeRegressor'] and params['max_features'] == 'auto':
+        params['max_features'] = None
+    return (name,) + tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+def model_classes(modelname):
+    """The models of model_select(modelname) grouped by prediction_class.
+
+    Parameters
+    ----------
+    modelname: str
+        'KNN', 'LR', 'RFC', 'RFR', 'DTC', 'DTR', 'SVM', 'GBDT'
+
+    Returns
+    -------
+    models: list
+        model_select(modelname).
+
+    classes: list
+        The indexes in models of the members of every class, in increasing order.
+    """
+    models = model_select(modelname)
+    classes = {}
+    for k, model in enumerate(models):
+        classes.setdefault(prediction_class(model), []).append(k)
+    # dicts keep the insertion order, the classes are in the order of their representatives
+    return models, list(classes.values())
+
+
+def is_deterministic(model):
+    """Whether fitting the model draws no random numbers, so that its outputs only
+    depend on its prediction_class and its training data: KNN, and LR with the
+    newton-cg and lbfgs solvers. The other models of model_select draw from the
+    global random generator when their random_state is None (bootstrap, feature
+    permutations, shuffling of liblinear, sag and saga, Platt scaling of SVC).
+
+    Parameters
+    ----------
+    model: sklearn model
+
+    Returns
+    -------
+    deterministic: bool
+    """
+    name = type(model).__name__
+    if name == 'KNeighborsClassifier':
+        return True
+    if name == 'LogisticRegression':
+        return model.get_params()['solver'] in ['newton-cg', 'lbfgs']
+    return False
+
 
 
 
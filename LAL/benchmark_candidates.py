@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from Classes.active_learner import ActiveLearnerLAL
+from Classes.dataset import Dataset, DatasetForestCoverType
+
+# Selection latency of ActiveLearnerLAL on growing subsets of the Forest Cover pool and accuracy after nIterations,
+# for LAL scoring all the unlabelled points against the candidate modes with a fixed number of candidates per query
+
+fn = 'LAL-randomtree-simulatedunbalanced-big.npz'
+parameters = {'est': 2000, 'depth': 40, 'feat': 6 }
+regression_data = np.load('./lal datasets/'+fn)
+print('Building lal regression model..')
+lalModel = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'],
+                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
+lalModel.fit(regression_data['arr_0'], np.ravel(regression_data['arr_1']))
+
+nEstimators = 50
+nStart = 2
+nIterations = 50
+maxCandidates = 1000
+poolSizes = [10**4, 10**5, None]
+modes = ['all', 'random', 'uncertainty', 'cluster']
+quality_metrics = ['accuracy']
+
+cover = DatasetForestCoverType()
+# LAL works with binary tasks: spruce/fir (cover type 1) against the rest, labels as a column like in the other datasets
+cover.trainLabels = np.reshape(cover.trainLabels==1, (-1,1)).astype(float)
+cover.testLabels = np.reshape(cover.testLabels==1, (-1,1)).astype(float)
+
+np.random.seed(0)
+order = np.random.permutation(np.shape(cover.trainData)[0])
+for poolSize in poolSizes:
+    dtst = Dataset()
+    dtst.trainData = cover.trainData[order[:poolSize],:]
+    dtst.trainLabels = cover.trainLabels[order[:poolSize],:]
+    dtst.testData = cover.testData
+    dtst.testLabels = cover.testLabels
+    dtst.setStartState(nStart)
+    print('\npool size = ', np.shape(dtst.trainData)[0])
+    for mode in modes:
+        alLAL = ActiveLearnerLAL(dtst, nEstimators, 'lal-'+mode, lalModel, candidates=mode, maxCandidates=maxCandidates)
+        times = []
+        for it in range(nIterations):
+            alLAL.train()
+            start = time.perf_counter()
+            alLAL.selectNext()
+            times.append(time.perf_counter()-start)
+        alLAL.train()
+        accuracy = alLAL.evaluate(quality_metrics)['accuracy']
+        # the first query of 'cluster' also clusters the training data
+        print('%-12s selectNext = %.4fs per query (first %.4fs), accuracy after %d queries = %.4f' % (mode, np.median(times), times[0], nIterations, accuracy))
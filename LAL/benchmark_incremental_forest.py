@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from Classes.active_learner import ActiveLearnerUncertainty
+from Classes.dataset import DatasetCheckerboard2x2
+
+# Accuracy curves and per-iteration training time of the base forest:
+# retrained from scratch after every label (as before) against updated incrementally (online bagging), with all the
+# trees whose leaf has to be split regrown at once or at most maxRefits of them per update
+
+nExperiments = 5
+nEstimators = 50
+nStart = 2
+nIterations = 100
+quality_metrics = ['accuracy']
+maxRefits = 5
+
+dtst = DatasetCheckerboard2x2()
+modes = {'full retraining': None, 'incremental': None, 'incremental, capped': maxRefits}
+accuracy = {mode: np.zeros((nExperiments, nIterations)) for mode in modes}
+trainTime = {mode: np.zeros((nExperiments, nIterations)) for mode in modes}
+
+for i in range(nExperiments):
+    print('\n experiment #'+str(i+1))
+    dtst.setStartState(nStart)
+    for mode in modes:
+        alearner = ActiveLearnerUncertainty(dtst, nEstimators, mode, incremental=mode!='full retraining')
+        if alearner.incremental:
+            alearner.model.max_refits = modes[mode]
+        for it in range(nIterations):
+            start = time.perf_counter()
+            alearner.train()
+            trainTime[mode][i, it] = time.perf_counter()-start
+            accuracy[mode][i, it] = alearner.evaluate(quality_metrics)['accuracy']
+            alearner.selectNext()
+
+print()
+for mode in modes:
+    print('%-16s train time per iteration = %.4fs, final accuracy = %.4f' % (mode, np.mean(trainTime[mode]), np.mean(accuracy[mode][:,-1])))
+
+plt.figure()
+for mode in modes:
+    plt.plot(np.mean(accuracy[mode], axis=0), label=mode)
+plt.xlabel('# labelled points')
+plt.ylabel('accuracy')
+plt.legend(loc='lower right')
+
+plt.figure()
+for mode in modes:
+    plt.plot(np.mean(trainTime[mode], axis=0), label=mode)
+plt.xlabel('# labelled points')
+plt.ylabel('train time, s')
+plt.legend(loc='upper left')
+plt.show()
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+
+from Classes.index_pool import IndexPool
+
+# Cost of labelling one point in a pool of 10^6 points:
+# concatenate/delete (and a permutation of the unlabelled points for random sampling) as the learners did before
+# against the index pool, where a query only swaps two entries
+
+nPoints = 10**6
+nStart = 2
+nQueries = 1000
+
+np.random.seed(0)
+indices = np.random.permutation(nPoints)
+# positions of the selected points in the unlabelled set, as the selection strategies return them
+positions = np.random.randint(0, nPoints-nStart-nQueries, nQueries)
+
+# strategies that select a point: uncertainty, LAL
+indicesKnown = indices[:nStart]
+indicesUnknown = indices[nStart:]
+start = time.perf_counter()
+for p in positions:
+    selectedIndex = indicesUnknown[[p]]
+    indicesKnown = np.concatenate(([indicesKnown, selectedIndex]))
+    indicesUnknown = np.delete(indicesUnknown, [p])
+timeDelete = (time.perf_counter()-start)/nQueries
+
+pool = IndexPool(indices[:nStart], indices[nStart:], nPoints)
+start = time.perf_counter()
+for p in positions:
+    pool.addUnknownAt([p])
+timePool = (time.perf_counter()-start)/nQueries
+
+# random sampling
+indicesKnown = indices[:nStart]
+indicesUnknown = indices[nStart:]
+start = time.perf_counter()
+for q in range(nQueries):
+    indicesUnknown = np.random.permutation(indicesUnknown)
+    indicesKnown = np.concatenate(([indicesKnown, indicesUnknown[:1]]))
+    indicesUnknown = indicesUnknown[1:]
+timePermutation = (time.perf_counter()-start)/nQueries
+
+pool = IndexPool(indices[:nStart], indices[nStart:], nPoints)
+start = time.perf_counter()
+for q in range(nQueries):
+    pool.addRandom()
+timeRandom = (time.perf_counter()-start)/nQueries
+
+print('pool of %d points, time per query averaged over %d queries' % (nPoints, nQueries))
+print('selection  concatenate/delete   = %10.2fus' % (timeDelete*1e6))
+print('selection  index pool           = %10.2fus' % (timePool*1e6))
+print('random     permute/concatenate  = %10.2fus' % (timePermutation*1e6))
+print('random     index pool           = %10.2fus' % (timeRandom*1e6))
@@ -0,0 +1,94 @@
+import copy
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from Classes.active_learner import ActiveLearnerLAL
+from Classes.dataset import DatasetForestCoverType
+
+# Latency of ActiveLearnerLAL.selectNext on the Forest Cover pool:
+# the LAL features computed tree by tree as before against the single pass of Classes/lal_features.py,
+# and the LAL regressor against its specialization on the features that are constant within a query
+
+
+def legacyLALfeatures(alearner):
+    '''the LAL features as they were computed in every active learner before'''
+    model = alearner.model
+    unknown_data = alearner.dataset.trainData[alearner.indicesUnknown,:]
+    known_labels = alearner.dataset.trainLabels[alearner.indicesKnown,:]
+    n_lablled = np.size(alearner.indicesKnown)
+    n_dim = np.shape(alearner.dataset.trainData)[1]
+    temp = np.array([tree.predict_proba(unknown_data)[:,0] for tree in model.estimators_])
+    f_1 = np.mean(temp, axis=0)
+    f_2 = np.std(temp, axis=0)
+    f_3 = (sum(known_labels>0)/n_lablled)*np.ones_like(f_1)
+    f_4 = model.oob_score_*np.ones_like(f_1)
+    f_5 = np.std(model.feature_importances_/n_dim)*np.ones_like(f_1)
+    f_6 = np.mean(f_2, axis=0)*np.ones_like(f_1)
+    f_7 = np.mean(np.array([tree.tree_.max_depth for tree in model.estimators_]))*np.ones_like(f_1)
+    f_8 = np.size(alearner.indicesKnown)*np.ones_like(f_1)
+    LALfeatures = np.concatenate(([f_1], [f_2], [f_3], [f_4], [f_5], [f_6], [f_7], [f_8]), axis=0)
+    return np.transpose(LALfeatures)
+
+
+fn = 'LAL-randomtree-simulatedunbalanced-big.npz'
+parameters = {'est': 2000, 'depth': 40, 'feat': 6 }
+regression_data = np.load('./lal datasets/'+fn)
+print('Building lal regression model..')
+lalModel = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'],
+                                 max_features=parameters['feat'], oob_score=True, n_jobs=8)
+lalModel.fit(regression_data['arr_0'], np.ravel(regression_data['arr_1']))
+
+nEstimators = 50
+nStart = 2
+nIterations = 20
+
+dtst = DatasetForestCoverType()
+# LAL works with binary tasks: spruce/fir (cover type 1) against the rest, labels as a column like in the other datasets
+dtst.trainLabels = np.reshape(dtst.trainLabels==1, (-1,1)).astype(float)
+dtst.testLabels = np.reshape(dtst.testLabels==1, (-1,1)).astype(float)
+dtst.setStartState(nStart)
+
+alLAL = ActiveLearnerLAL(dtst, nEstimators, 'lal-rand', lalModel, specializeRegressor=True)
+# the specialized forest sums the trees in order, like a single-threaded forest
+lalModelSerial = copy.copy(lalModel)
+lalModelSerial.n_jobs = 1
+print('pool size = ', np.size(alLAL.indicesUnknown))
+
+times_legacy = []
+times_kernel = []
+times_regressor = []
+times_specialized = []
+times_select = []
+for it in range(nIterations):
+    alLAL.train()
+
+    start = time.perf_counter()
+    legacy = legacyLALfeatures(alLAL)
+    times_legacy.append(time.perf_counter()-start)
+
+    start = time.perf_counter()
+    features = alLAL.get_basemodel_sample_data()
+    times_kernel.append(time.perf_counter()-start)
+    assert np.array_equal(legacy.astype(np.float32), features)
+    assert np.array_equal(lalModel.predict(legacy), lalModel.predict(features))
+
+    start = time.perf_counter()
+    prediction = lalModel.predict(features)
+    times_regressor.append(time.perf_counter()-start)
+
+    start = time.perf_counter()
+    specialized = alLAL._predictLAL(features)
+    times_specialized.append(time.perf_counter()-start)
+    assert np.array_equal(lalModelSerial.predict(features), specialized)
+
+    start = time.perf_counter()
+    alLAL.selectNext()
+    times_select.append(time.perf_counter()-start)
+
+print('features, tree by tree:      %.4fs per query' % np.median(times_legacy))
+print('features, single pass:       %.4fs per query' % np.median(times_kernel))
+print('regressor, full forest:      %.4fs per query' % np.median(times_regressor))
+print('regressor, specialized:      %.4fs per query' % np.median(times_specialized))
+print('selectNext (specialized):    %.4fs per query' % np.median(times_select))
@@ -0,0 +1,34 @@
+import numpy as np
+from sklearn import metrics
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from Classes.evaluation import evaluate
+
+# The measures of evaluate against the ones of sklearn.metrics, for binary labels and for multiclass labels
+# (e.g. DatasetForestCoverType of AL_LAL.py), whole and in chunks
+
+np.random.seed(0)
+for nClasses in [2, 7]:
+    X, y = make_classification(n_samples=2000, n_features=10, n_informative=6, n_classes=nClasses, random_state=0)
+    # labels 1..nClasses like in the datasets
+    y = y+1
+    model = RandomForestClassifier(50, random_state=0).fit(X[:200], y[:200])
+    testData, testLabels = X[200:], y[200:].reshape(-1, 1)
+    prediction = model.predict(testData)
+    for chunkSize in [None, 128]:
+        accuracy = evaluate(model, testData, testLabels, ['accuracy'], chunkSize)['accuracy']
+        assert np.isclose(accuracy, metrics.accuracy_score(np.ravel(testLabels), prediction))
+        if nClasses==2:
+            performance = evaluate(model, testData, testLabels, ['TN', 'FP', 'FN', 'TP', 'auc'], chunkSize)
+            TN, FP, FN, TP = metrics.confusion_matrix(np.ravel(testLabels), prediction).ravel()
+            assert (performance['TN'], performance['FP'], performance['FN'], performance['TP'])==(TN, FP, FN, TP)
+            assert np.isclose(performance['auc'], metrics.roc_auc_score(np.ravel(testLabels), model.predict_proba(testData)[:,1]))
+    print('%d classes: accuracy = %.4f, the same as sklearn.metrics' % (nClasses, accuracy))
+
+    # a model that has only seen two of the classes, as at the start of active learning
+    known = np.flatnonzero(y[:200]<=2)
+    model = RandomForestClassifier(50, random_state=0).fit(X[known], y[known])
+    accuracy = evaluate(model, testData, testLabels, ['accuracy'])['accuracy']
+    assert np.isclose(accuracy, metrics.accuracy_score(np.ravel(testLabels), model.predict(testData)))
+    print('%d classes, 2 of them labelled: accuracy = %.4f, the same as sklearn.metrics' % (nClasses, accuracy))
@@ -0,0 +1,36 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from Classes.lal_forest import saveForest
+
+# Fit the LAL regressors once and export them as flat node arrays (Classes/lal_forest.py),
+# the experiment scripts then map them with loadForest instead of fitting or unpickling the forests at every start.
+# usage: python export_lal_models.py                    fits and exports the regressors of LAL-independent and LAL-iterative
+#        python export_lal_models.py <pickle> <name>    exports a pickled RandomForestRegressor, e.g. LALmodel2 of AL_LAL.py
+
+folder = './lal models/'
+
+# we found these parameters by cross-validating the regressor and now we reuse these expreiments
+models = {'LAL-randomtree-simulatedunbalanced-big': {'est': 2000, 'depth': 40, 'feat': 6 },
+          'LAL-iterativetree-simulatedunbalanced-big': {'est': 1000, 'depth': 40, 'feat': 6 }}
+
+if len(sys.argv)==3:
+    with open(sys.argv[1],'rb') as f:
+        lalModel = pickle.load(f)
+    saveForest(lalModel, os.path.join(folder, sys.argv[2]))
+    print('Exported', sys.argv[1], 'to', os.path.join(folder, sys.argv[2]))
+else:
+    for fn in models:
+        parameters = models[fn]
+        regression_data = np.load('./lal datasets/'+fn+'.npz')
+        print('Building lal regression model', fn, '..')
+        lalModel = RandomForestRegressor(n_estimators = parameters['est'], max_depth = parameters['depth'],
+                                         max_features=parameters['feat'], oob_score=True, n_jobs=8)
+        lalModel.fit(regression_data['arr_0'], np.ravel(regression_data['arr_1']))
+        print('Oob score = ', lalModel.oob_score_)
+        saveForest(lalModel, os.path.join(folder, fn))
+        print('Exported to', os.path.join(folder, fn))
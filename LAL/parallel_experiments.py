@@ -0,0 +1,60 @@
+import numpy as np
+
+# import various AL strategies
+from Classes.active_learner import ActiveLearnerRandom
+from Classes.active_learner import ActiveLearnerUncertainty
+from Classes.active_learner import ActiveLearnerLAL
+# import the dataset class
+from Classes.dataset import DatasetCheckerboard2x2, DatasetCheckerboard4x4, DatasetRotatedCheckerboard2x2, \
+    DatasetStriatumMini, DatasetBreast, DatasetDiabetes, Datasetwaveform_5000_1_2, Datasetclean1
+# the parallel runner and Result class that saves the results
+from Classes.parallel_experiment import ParallelExperiment, LearnerSpec, runExperiments
+from Classes.shared_dataset import SharedDataset, publishDataset
+from Classes.results import Results
+from Classes.lal_forest import loadForest
+
+# The experiments of train.py with all (dataset, replica, learner) tasks spread over a pool of processes.
+# Every task has its own random stream derived from seed, the results are the same for any number of cores.
+# The datasets are published once as memory-mapped arrays that all the workers share.
+
+if __name__ == '__main__':
+
+    # the pickled regressor exported once with: python export_lal_models.py LALmodel2 LALmodel2
+    # the workers map the same files instead of receiving a copy of the forest
+    lalModel2 = loadForest('./lal models/LALmodel2')
+
+    # number of experiment repeats
+    nExperiments = 10
+    # number of estimators (random trees) in the classifier
+    nEstimators = 50
+    # number of labeled points at the beginning of the AL experiment
+    nStart = 2
+    # number of iterations in AL experiment
+    nIterations = 50
+    # the quality metrics computed on the test set to evaluate active learners
+    quality_metrics = ['accuracy']
+    # cores for the whole run and threads of the forests in every task
+    nCores = None
+    nJobs = 1
+    seed = 805
+
+    datasets = [DatasetCheckerboard2x2, DatasetCheckerboard4x4, DatasetRotatedCheckerboard2x2, DatasetStriatumMini,
+                DatasetBreast, DatasetDiabetes, Datasetwaveform_5000_1_2, Datasetclean1]
+    als = [LearnerSpec(ActiveLearnerRandom, 'random'),
+           LearnerSpec(ActiveLearnerUncertainty, 'uncertainty'),
+           LearnerSpec(ActiveLearnerLAL, 'lal-iter', lalModel2)]
+
+    exps = []
+    for dataset in datasets:
+        np.random.seed(seed)
+        folder = './data/shared/'+dataset.__name__
+        publishDataset(dataset(), folder)
+        exps.append(ParallelExperiment(nIterations, nEstimators, quality_metrics, SharedDataset, als, nStart, 'experiment', datasetArgs=(folder,), seed=seed))
+    performances = runExperiments(exps, nExperiments, nCores, nJobs)
+
+    for dataset, exp, performance in zip(datasets, exps, performances):
+        # the Results class helps to add, save and plot results of the experiments
+        res = Results(exp, nExperiments)
+        for i in range(nExperiments):
+            res.addPerformance(performance[i])
+        res.saveResults(dataset.__name__+'()')
@@ -16,6 +16,7 @@ from Classes.dataset import DatasetCheckerboard2x2, DatasetCheckerboard4x4, Data
 
 # import the model for LAL strategy
 from Classes.lal_model import LALmodel
+from Classes.lal_forest import loadForest
 # import Experiment and Result classes that will be responsible for running AL and saving the results
 from Classes.experiment import Experiment
 from Classes.results import Results
@@ -25,14 +26,12 @@ from sklearn.linear_model import LinearRegression
 import random
 
 # LAL
-with open('LALmodel2','rb') as f:
-    lalModel2 = pickle.load(f)
+# the pickled regressor exported once with: python export_lal_models.py LALmodel2 LALmodel2
+lalModel2 = loadForest('./lal models/LALmodel2')
 
 
 
 fn = 'LAL-randomtree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 2000, 'depth': 40, 'feat': 6 }
 filename = './lal datasets/'+fn
 regression_data1 = np.load(filename)
 regression_features1 = regression_data1['arr_0']
@@ -40,8 +39,6 @@ regression_labels1 = regression_data1['arr_1']
 
 
 fn = 'LAL-iterativetree-simulatedunbalanced-big.npz'
-# we found these parameters by cross-validating the regressor and now we reuse these expreiments
-parameters = {'est': 1000, 'depth': 40, 'feat': 6 }
 filename = './lal datasets/'+fn
 regression_data2 = np.load(filename)
 regression_features2 = regression_data2['arr_0']